@@ -4,11 +4,45 @@ from streamlit_folium import st_folium
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
-from wordcloud import WordCloud
+from wordcloud import STOPWORDS, WordCloud
 import matplotlib.pyplot as plt
-from modules.clustering import perform_clustering
-from collections import Counter
+from modules.clustering import IncrementalClustering, perform_clustering
+from modules.map_rendering import CATEGORY_COLORS, BinnedHeatMap, LazyPopupMarkerCluster, cluster_points_layer
+from modules.spatial_binning import build_bin_pyramid
+from modules.embeddings import encode_texts
+from modules.keywords import KeywordIndex, tokenize
+from modules.search import SearchIndex, paginate
+from modules.similarity import SimilarityIndex
 import numpy as np
+import os
+import time
+import uuid
+from modules.aggregates import FeedbackCube
+from modules.filters import FilterEngine
+from modules.jobs import JobManager
+from modules.spatial_index import SpatialIndex
+from modules.dataset import DEFAULT_ARROW_PATH, DEFAULT_PARQUET_PATH, has_embeddings, load_embeddings, load_frame
+
+JSON_DATA_PATH = 'data/feedback_results_with_location.json'
+
+# Above this many rows the map defaults to a server-side binned heatmap
+MARKER_LIMIT = 20000
+
+# Markers are sent for the visible map area grown by this fraction on every side,
+# so small pans and zooming in need no new render
+VIEWPORT_PADDING = 0.5
+DEFAULT_MAP_CENTER = [20.5937, 78.9629]
+DEFAULT_MAP_ZOOM = 5
+
+# Rows per page in the Feedback Explorer table
+EXPLORER_PAGE_SIZE = 100
+
+# Concurrent clustering runs across all sessions, and how often a page polls a running one
+CLUSTERING_WORKERS = 2
+JOB_POLL_SECONDS = 1.0
+
+# Memory all sessions' finished clustering results may hold together; older ones are recomputed on demand
+CLUSTER_RESULTS_BUDGET = 512 * 2**20
 
 # Page Config
 st.set_page_config(
@@ -37,13 +71,106 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load Data
+def latest_data_path():
+    """Most recently written results file: columnar datasets from main.py --format, or the JSON export"""
+    candidates = [p for p in (DEFAULT_ARROW_PATH, DEFAULT_PARQUET_PATH, JSON_DATA_PATH) if os.path.exists(p)]
+    return max(candidates, key=os.path.getmtime)
+
+@st.cache_resource
+def load_data(path, mtime):
+    """
+    Compact, memory-mapped frame shared by every session instead of copied per rerun;
+    the app treats it as read-only. JSON exports are converted to a columnar cache once.
+    """
+    return load_frame(path)
+
 @st.cache_data
-def load_data():
-    df = pd.read_json('data/feedback_results_with_location.json')
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
+def load_cube(path, mtime, _df):
+    """Day x category x sentiment x emotion counts that the metrics and Analytics charts slice"""
+    return FeedbackCube.from_frame(_df)
+
+@st.cache_resource
+def load_filter_engine(path, mtime, _df):
+    """Integer day and label codes per report, computed once per dataset for the sidebar filters"""
+    return FilterEngine(_df)
+
+@st.cache_resource
+def load_keyword_index(path, mtime, _df):
+    """Term counts per report, tokenized once per dataset; shared across sessions"""
+    return KeywordIndex(_df['text'].tolist())
+
+@st.cache_data(max_entries=16)
+def load_bin_pyramid(path, mtime, signature, _df, _rows):
+    """Heatmap bins of the filtered reports, built once per dataset and filter selection"""
+    return build_bin_pyramid(_df.iloc[_rows, _df.columns.get_indexer(['latitude', 'longitude'])], facets=())
 
-df = load_data()
+@st.cache_resource
+def load_spatial_index(path, mtime, _df):
+    """Radius, nearest-neighbour and bounding-box lookups over every report's coordinates"""
+    return SpatialIndex.from_frame(_df)
+
+def map_viewport(map_state, padding=VIEWPORT_PADDING):
+    """Padded (south, west, north, east) of the area shown by st_folium, or None before the first render"""
+    bounds = (map_state or {}).get('bounds') or {}
+    south_west, north_east = bounds.get('_southWest') or {}, bounds.get('_northEast') or {}
+    if south_west.get('lat') is None or north_east.get('lat') is None:
+        return None
+    lat_pad = (north_east['lat'] - south_west['lat']) * padding
+    lon_pad = (north_east['lng'] - south_west['lng']) * padding
+    return (max(south_west['lat'] - lat_pad, -90.0), south_west['lng'] - lon_pad,
+            min(north_east['lat'] + lat_pad, 90.0), north_east['lng'] + lon_pad)
+
+def bbox_contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+@st.cache_resource
+def load_search_index(path, mtime, _df, _keyword_index):
+    """Full-text index for the Feedback Explorer, sharing the keyword index postings"""
+    return SearchIndex(_df['text'].tolist(), keyword_index=_keyword_index)
+
+@st.cache_resource
+def get_job_manager():
+    """Background jobs shared by every session, so identical clustering requests run once"""
+    return JobManager(max_workers=CLUSTERING_WORKERS, max_result_bytes=CLUSTER_RESULTS_BUDGET)
+
+@st.cache_resource(max_entries=8)
+def get_incremental_clustering(path, signature, radius_km, min_samples):
+    """
+    KMeans clustering state kept across versions of one dataset and filter selection,
+    so reports appended to the file only update the areas they fall in
+    """
+    return IncrementalClustering(radius_km, min_samples)
+
+def cluster_rows(frame, rows, progress, incremental=None, embeddings=None, **options):
+    """
+    Clustering of some rows of frame, run inside a background job: an update of the
+    incremental state if given, otherwise perform_clustering
+    """
+    if incremental is not None:
+        return incremental.update(frame.iloc[rows], embeddings=embeddings, progress=progress)
+    return perform_clustering(frame.iloc[rows], embeddings=embeddings, progress=progress, **options)
+
+@st.cache_resource
+def load_precomputed_embeddings(path, mtime):
+    """Memory-mapped embedding matrix stored at ingest, if the dataset has one"""
+    if path == JSON_DATA_PATH or not has_embeddings(path):
+        return None
+    return load_embeddings(path)
+
+@st.cache_resource
+def load_similarity_index(path, mtime, _df, _embeddings):
+    """Approximate nearest-neighbour index over every report's text embedding"""
+    vectors = _embeddings if _embeddings is not None else encode_texts(_df['text'].tolist())
+    return SimilarityIndex(vectors)
+
+data_path = latest_data_path()
+data_mtime = os.path.getmtime(data_path)  # part of the cache key so rewritten files are reloaded
+df = load_data(data_path, data_mtime)
+precomputed_embeddings = load_precomputed_embeddings(data_path, data_mtime)
+cube = load_cube(data_path, data_mtime, df)
+keyword_index = load_keyword_index(data_path, data_mtime, df)
+filters = load_filter_engine(data_path, data_mtime, df)
+spatial_index = load_spatial_index(data_path, data_mtime, df)
 
 # Sidebar Filters
 st.sidebar.header("🔍 Filters")
@@ -54,8 +181,8 @@ date_range = st.sidebar.date_input(
 
 sentiment_filter = st.sidebar.multiselect(
     "Sentiment",
-    options=df['sentiment'].unique(),
-    default=df['sentiment'].unique()
+    options=filters.labels['sentiment'],
+    default=filters.labels['sentiment']
 )
 
 category_filter = st.sidebar.multiselect(
@@ -66,18 +193,52 @@ category_filter = st.sidebar.multiselect(
 
 radius_km = st.sidebar.slider("Clustering Radius (km)", 1, 20, 5)
 min_samples = st.sidebar.slider("Minimum Cluster Size", 2, 10, 3)
+refine_mode = st.sidebar.radio(
+    "Split areas by",
+    ["Topic (KMeans)", "Near-duplicate reports"],
+    help="Near-duplicate grouping links reports whose text embeddings exceed the similarity threshold"
+)
+similarity_threshold = st.sidebar.slider("Similarity Threshold", 0.5, 0.99, 0.85, 0.01,
+                                         disabled=refine_mode != "Near-duplicate reports")
 
-# Apply Filters
-filtered_df = df[
-    (df['sentiment'].isin(sentiment_filter)) &
-    (df['category'].isin(category_filter)) &
-    (df['timestamp'].dt.date >= date_range[0]) &
-    (df['timestamp'].dt.date <= date_range[1])
-]
+# Bounds at the edges of the data are left open, so the default selection (and everything
+# cached per selection, like incremental clustering) keeps its key when newer reports arrive
+date_start = None if date_range[0] <= df['timestamp'].min().date() else date_range[0]
+date_end = None if date_range[-1] >= df['timestamp'].max().date() else date_range[-1]
+
+# Apply Filters: one memoized set of row positions shared by every tab
+selection = filters.select(date_start, date_end, sentiment=sentiment_filter, category=category_filter)
+filtered_rows = selection.positions
+
+def filtered_frame(columns=None):
+    """The filtered reports, copying only the columns a view needs"""
+    if columns is None:
+        return df.iloc[filtered_rows]
+    return df.iloc[filtered_rows, df.columns.get_indexer(columns)]
+
+filtered_cube = cube.slice(
+    date_start, date_end,
+    sentiment=sentiment_filter,
+    category=category_filter
+)
+
+# Clustering runs in the background; results are cached per dataset, filters and parameters
+jobs = get_job_manager()
+refine = 'similarity' if refine_mode == "Near-duplicate reports" else 'kmeans'
+cluster_key = (
+    data_path, data_mtime, selection.signature, radius_km, min_samples,
+    refine, similarity_threshold if refine == 'similarity' else None
+)
+cluster_job = jobs.lookup(cluster_key)
+clustered_df = cluster_job.result if cluster_job is not None and cluster_job.status == 'done' else None
 
 # Initialize Session State
-if 'clustered_df' not in st.session_state:
-    st.session_state.clustered_df = None
+if 'cluster_job_id' not in st.session_state:
+    st.session_state.cluster_job_id = None
+if 'session_id' not in st.session_state:
+    # Identifies this browser session as a subscriber of shared clustering jobs
+    st.session_state.session_id = uuid.uuid4().hex
+subscribed = cluster_job is not None and st.session_state.session_id in cluster_job.subscribers
 
 # Main Dashboard
 st.title("📊 Feedback Analyzer Pro")
@@ -85,46 +246,59 @@ st.title("📊 Feedback Analyzer Pro")
 # Metrics Row
 col1, col2, col3, col4 = st.columns(4)
 with col1:
-    st.markdown(f'<div class="metric-card"><h3>Total Feedback</h3><h2>{len(filtered_df)}</h2></div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="metric-card"><h3>Total Feedback</h3><h2>{filtered_cube.total()}</h2></div>', unsafe_allow_html=True)
 with col2:
-    st.markdown(f'<div class="metric-card"><h3>Positive</h3><h2 style="color:green;">{len(filtered_df[filtered_df["sentiment"] == "Positive"])}</h2></div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="metric-card"><h3>Positive</h3><h2 style="color:green;">{filtered_cube.count("sentiment", "Positive")}</h2></div>', unsafe_allow_html=True)
 with col3:
-    st.markdown(f'<div class="metric-card"><h3>Negative</h3><h2 style="color:red;">{len(filtered_df[filtered_df["sentiment"] == "Negative"])}</h2></div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="metric-card"><h3>Negative</h3><h2 style="color:red;">{filtered_cube.count("sentiment", "Negative")}</h2></div>', unsafe_allow_html=True)
 with col4:
-    st.markdown(f'<div class="metric-card"><h3>Clusters</h3><h2>{len(st.session_state.clustered_df["cluster"].unique()) if st.session_state.clustered_df is not None else 0}</h2></div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="metric-card"><h3>Clusters</h3><h2>{len(clustered_df["cluster"].unique()) if clustered_df is not None else 0}</h2></div>', unsafe_allow_html=True)
 
 # Tabs
 tab1, tab2, tab3, tab4 = st.tabs(["🗺️ Map View", "📈 Analytics", "🔍 Cluster Analysis", "💬 Feedback Explorer"])
 
 with tab1:
     st.header("Geospatial Feedback Visualization")
-    m = folium.Map(location=[20.5937, 78.9629], zoom_start=5, tiles="CartoDB Positron")
-    
-    category_colors = {
-        "Health": "green",
-        "Education": "blue",
-        "Infrastructure": "orange",
-        "Environment": "purple",
-        "Public Safety": "red"
-    }
+    # Only reports around the last seen map area are rendered; the whole set until the map reports its bounds
+    view = st.session_state.get('map_view')
+    visible_rows = filtered_rows
+    if view is not None:
+        visible_rows = np.intersect1d(filtered_rows, spatial_index.in_bbox(*view['bbox']), assume_unique=True)
+    m = folium.Map(
+        location=view['center'] if view else DEFAULT_MAP_CENTER,
+        zoom_start=view['zoom'] if view else DEFAULT_MAP_ZOOM,
+        tiles="CartoDB Positron"
+    )
     
-    marker_cluster = folium.plugins.MarkerCluster().add_to(m)
-    for _, row in filtered_df.iterrows():
-        folium.Marker(
-            [row['latitude'], row['longitude']],
-            popup=f"""
-                <b>Category:</b> {row['category']}<br>
-                <b>Sentiment:</b> {row['sentiment']}<br>
-                <b>Feedback:</b> {row['text'][:100]}...
-            """,
-            icon=folium.Icon(
-                color=category_colors.get(row['category'], 'gray'),
-                icon='info-sign',
-                prefix='fa'
-            )
-        ).add_to(marker_cluster)
+    display_mode = st.radio(
+        "Display",
+        ["Markers", "Binned heatmap"],
+        index=0 if len(visible_rows) <= MARKER_LIMIT else 1,
+        horizontal=True
+    )
+    if display_mode == "Markers":
+        # Markers and popups are built in the browser from compact row arrays
+        LazyPopupMarkerCluster(
+            df.iloc[visible_rows, df.columns.get_indexer(['latitude', 'longitude', 'category', 'sentiment', 'text'])],
+            colors=CATEGORY_COLORS
+        ).add_to(m)
+    else:
+        # Only per-zoom bin centroids and weights are sent to the browser
+        BinnedHeatMap(load_bin_pyramid(data_path, data_mtime, selection.signature, df, filtered_rows),
+                      radius=12, blur=8).add_to(m)
     
-    st_folium(m, width=1200, height=600)
+    map_state = st_folium(m, key='feedback_map', width=1200, height=600, returned_objects=['bounds', 'center', 'zoom'])
+    shown = map_viewport(map_state, padding=0)
+    if shown is not None and (view is None or not bbox_contains(view['bbox'], shown)):
+        center = map_state.get('center') or {}
+        st.session_state.map_view = {
+            'bbox': map_viewport(map_state),
+            'center': [center.get('lat', DEFAULT_MAP_CENTER[0]), center.get('lng', DEFAULT_MAP_CENTER[1])],
+            'zoom': map_state.get('zoom') or DEFAULT_MAP_ZOOM
+        }
+        # The first render already drew every report; later views outside the drawn area need a new render
+        if view is not None and display_mode == "Markers":
+            st.rerun()
 
 with tab2:
     st.header("Feedback Analytics")
@@ -132,26 +306,25 @@ with tab2:
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("Sentiment Distribution")
-        fig1 = px.pie(filtered_df, names='sentiment', hole=0.3)
+        sentiment_totals = filtered_cube.totals('sentiment')
+        fig1 = px.pie(names=sentiment_totals.index, values=sentiment_totals.values, hole=0.3)
         st.plotly_chart(fig1, use_container_width=True)
     
     with col2:
         st.subheader("Category Distribution")
-        fig2 = px.bar(filtered_df['category'].value_counts(), 
+        fig2 = px.bar(filtered_cube.totals('category'),
                      labels={'value': 'Count', 'index': 'Category'})
         st.plotly_chart(fig2, use_container_width=True)
     
     st.subheader("Category Trends Over Time")
-    df_time = filtered_df.copy()
-    df_time['date'] = df_time['timestamp'].dt.date
-    fig3 = px.histogram(df_time, x='date', color='category', 
-                       barmode='stack', nbins=30)
+    fig3 = px.histogram(filtered_cube.daily('category'), x='date', y='count', color='category',
+                       histfunc='sum', barmode='stack', nbins=30)
     st.plotly_chart(fig3, use_container_width=True)
     
     st.subheader("Top Keywords")
-    text = " ".join(filtered_df['text'])
-    if text.strip():
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text)
+    frequencies = keyword_index.frequencies(filtered_rows, stopwords=STOPWORDS, signature=selection.signature)
+    if frequencies:
+        wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(frequencies)
         fig, ax = plt.subplots(figsize=(12, 6))
         ax.imshow(wordcloud, interpolation='bilinear')
         ax.axis("off")
@@ -161,16 +334,43 @@ with tab3:
     st.header("Issue Clustering")
     st.markdown("Group similar issues reported within a specified radius")
     
-    if st.button("Run Clustering"):
-        with st.spinner("Analyzing feedback patterns..."):
-            st.session_state.clustered_df = perform_clustering(
-                filtered_df,
-                max_radius_km=radius_km,
-                min_samples=min_samples
-            )
+    # Sessions not yet waiting on a running job can join it
+    if st.button("Run Clustering", disabled=subscribed and not cluster_job.finished):
+        # KMeans runs reuse the previous version's clusters when reports were only appended
+        incremental = None
+        if refine == 'kmeans':
+            incremental = get_incremental_clustering(data_path, selection.signature, radius_km, min_samples)
+        cluster_job = jobs.submit(
+            cluster_key, cluster_rows, df, filtered_rows,
+            max_radius_km=radius_km,
+            min_samples=min_samples,
+            embeddings=precomputed_embeddings,
+            refine=refine,
+            similarity_threshold=similarity_threshold,
+            incremental=incremental,
+            subscriber=st.session_state.session_id
+        )
+        st.session_state.cluster_job_id = cluster_job.id
+        subscribed = True
+    
+    if cluster_job is None:
+        previous = jobs.get(st.session_state.cluster_job_id)
+        if previous is not None and previous.key != cluster_key:
+            st.info("Filters or clustering parameters changed since the last run. Run clustering again to update the clusters.")
+    elif not cluster_job.finished:
+        st.progress(cluster_job.progress, text=cluster_job.message)
+        if not subscribed:
+            st.caption("Other sessions are waiting for this clustering run. Run Clustering to wait for it too.")
+        elif st.button("Cancel"):
+            # Only stops the job once no other session is waiting for it
+            if not jobs.cancel(cluster_job.id, subscriber=st.session_state.session_id):
+                st.info("Other sessions are waiting for this clustering run, so it keeps running for them.")
+    elif cluster_job.status == 'failed':
+        st.error(f"Clustering failed: {cluster_job.error}")
+    elif cluster_job.status == 'cancelled':
+        st.warning("Clustering was cancelled.")
     
-    if st.session_state.clustered_df is not None:
-        clustered_df = st.session_state.clustered_df
+    if clustered_df is not None:
         cluster_summaries = clustered_df.attrs.get('cluster_summaries', pd.DataFrame())
         
         st.subheader("Cluster Map View")
@@ -178,7 +378,6 @@ with tab3:
         colors = px.colors.qualitative.Plotly
         
         for _, cluster in cluster_summaries.iterrows():
-            cluster_data = clustered_df[clustered_df['cluster'] == cluster['cluster_id']]
             color = colors[cluster['cluster_id'] % len(colors)]
             
             folium.CircleMarker(
@@ -194,15 +393,9 @@ with tab3:
                     <b>Reports:</b> {cluster['count']}
                 """
             ).add_to(cluster_map)
-            
-            for _, row in cluster_data.iterrows():
-                folium.CircleMarker(
-                    location=[row['latitude'], row['longitude']],
-                    radius=5,
-                    color=color,
-                    fill=True,
-                    fill_opacity=0.5
-                ).add_to(cluster_map)
+        
+        # All member points in one canvas-rendered layer
+        cluster_points_layer(clustered_df, colors).add_to(cluster_map)
         
         folium.LayerControl().add_to(cluster_map)
         st_folium(cluster_map, width=1200, height=600)
@@ -215,13 +408,15 @@ with tab3:
                 with c1:
                     st.markdown(f"**📍 Center:** {cluster['center_lat']:.4f}, {cluster['center_lon']:.4f}")
                     st.markdown(f"**🏷️ Main Category:** {cluster['category']}")
+                    nearby, _ = spatial_index.within(cluster['center_lat'], cluster['center_lon'], radius_km)
+                    st.markdown(f"**🧭 Filtered reports within {radius_km} km of the center:** "
+                                f"{len(np.intersect1d(nearby, filtered_rows))}")
                 with c2:
                     st.markdown(f"**📊 Sentiment:** {len(cluster_data[cluster_data['sentiment']=='Positive'])} 👍 / {len(cluster_data[cluster_data['sentiment']=='Negative'])} 👎")
                     st.markdown(f"**📝 Main Issue:** {cluster['main_issue']}")
                 
                 st.markdown("**🔑 Keywords:**")
-                words = " ".join(cluster_data['text']).split()
-                word_freq = Counter([w.lower() for w in words if len(w) > 3]).most_common(5)
+                word_freq = keyword_index.top_terms(df.index.get_indexer(cluster_data.index), k=5, stopwords=None)
                 st.write(", ".join([f"{w[0]} ({w[1]})" for w in word_freq]))
                 
                 st.markdown("**📜 Sample Reports:**")
@@ -231,22 +426,36 @@ with tab3:
 with tab4:
     st.header("Feedback Explorer")
     
-    search_term = st.text_input("🔍 Search feedback text", "")
-    if search_term:
-        results = filtered_df[filtered_df['text'].str.contains(search_term, case=False)]
-    else:
-        results = filtered_df
+    search_term = st.text_input("🔍 Search feedback text", "", help="Matches words and parts of words; every word must appear")
     
     sentiment_select = st.multiselect(
         "Filter by sentiment",
-        options=filtered_df['sentiment'].unique(),
+        options=filtered_cube.totals('sentiment').index.tolist(),
         default=[]
     )
-    if sentiment_select:
-        results = results[results['sentiment'].isin(sentiment_select)]
+    # Options come from the filtered reports, so they narrow the sidebar selection
+    result_rows = filters.select(
+        date_start, date_end,
+        sentiment=sentiment_select or sentiment_filter,
+        category=category_filter
+    ).positions
+    
+    if search_term and tokenize(search_term):
+        # Ranked index lookup restricted to the filtered reports
+        search_index = load_search_index(data_path, data_mtime, df, keyword_index)
+        result_rows, _ = search_index.search(search_term, rows=result_rows)
+    elif search_term:
+        # Punctuation-only queries are not indexed; match them literally
+        matches = df['text'].iloc[result_rows].str.contains(search_term, case=False, regex=False)
+        result_rows = result_rows[matches.fillna(False).to_numpy(dtype=bool)]
+    
+    pages = max(1, -(-len(result_rows) // EXPLORER_PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+    st.caption(f"{len(result_rows)} matching reports")
+    page_rows, _ = paginate(result_rows, page, EXPLORER_PAGE_SIZE)
     
     st.dataframe(
-        results[['text', 'sentiment', 'category', 'location', 'timestamp']],
+        df.iloc[page_rows][['text', 'sentiment', 'category', 'location', 'timestamp']],
         column_config={
             "text": "Feedback",
             "sentiment": "Sentiment",
@@ -258,7 +467,26 @@ with tab4:
         use_container_width=True,
         height=600
     )
+    
+    if st.checkbox("Find similar reports") and len(result_rows):
+        # Rows of the index follow the positions of the full dataset
+        similarity_index = load_similarity_index(data_path, data_mtime, df, precomputed_embeddings)
+        options = df.index[result_rows[:1000]].tolist()
+        selected = st.selectbox(
+            "Report",
+            options,
+            format_func=lambda row: df.at[row, 'text'][:120]
+        )
+        rows, scores = similarity_index.similar_to_row(df.index.get_loc(selected), k=10)
+        similar = df.iloc[rows][['text', 'sentiment', 'category', 'location']].assign(similarity=scores.round(3))
+        st.dataframe(similar, hide_index=True, use_container_width=True)
 
 # Footer
 st.markdown("---")
-st.markdown("### Feedback Analyzer")
\ No newline at end of file
+st.markdown("### Feedback Analyzer")
+
+# Keep polling while clustering runs so progress and results show up without interaction,
+# and render once more when a job submitted during this run has already finished
+if cluster_job is not None and (not cluster_job.finished or (cluster_job.status == 'done' and clustered_df is None)):
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
@@ -1,55 +1,92 @@
+import argparse
+import contextlib
 import json
-from modules.sentiment_analysis import analyze_sentiment_and_categorize
-from geopy.geocoders import Nominatim
-import time
+import os
+from modules.analysis_cache import AnalysisCache
+from modules.geocoding import ConcurrentGeocoder, Geocoder, NOMINATIM_RATE
+from modules.pipeline import AnalysisPool, analyze_records, batched, iter_feedback, run_streaming
 
-# Initialize geocoder
-geolocator = Nominatim(user_agent="feedback-analyzer")
+parser = argparse.ArgumentParser(description="Analyze feedback sentiment, emotion, category and location")
+parser.add_argument("--input", default="data/feedback_data.json", help="Feedback file, either a JSON array or JSONL")
+parser.add_argument("--output", default=None, help="Results file (defaults to data/feedback_results_with_location.json, or .jsonl with --stream)")
+parser.add_argument("--stream", action="store_true", help="Process in bounded memory and append results to a JSONL file with checkpoints")
+parser.add_argument("--resume", action="store_true", help="With --stream, continue from the last checkpoint instead of starting over")
+parser.add_argument("--format", choices=["json", "parquet", "arrow"], default="json", help="Output format when not streaming")
+parser.add_argument("--embeddings", action="store_true", help="Also store sentence embeddings (requires --format parquet or arrow)")
+parser.add_argument("--batch-size", type=int, default=32, help="Number of texts per emotion model forward pass")
+parser.add_argument("--workers", type=int, default=0, help="Run the models in this many worker processes (0 analyzes in this process)")
+parser.add_argument("--no-cache", action="store_true", help="Re-analyze every record instead of reusing cached results for unchanged texts")
+parser.add_argument("--emotion-backend", choices=["pytorch", "onnx"], default=None, help="Emotion classifier backend; onnx runs an int8-quantized export with ONNX Runtime (defaults to EMOTION_BACKEND or pytorch)")
+parser.add_argument("--geocode-workers", type=int, default=2, help="Background geocoding threads (0 geocodes synchronously)")
+parser.add_argument("--geocode-rate", type=float, default=NOMINATIM_RATE, help="Maximum geocoder requests per second")
+parser.add_argument("--offline", action="store_true", help="Skip Nominatim and resolve locations from the cache and gazetteer only")
 
-# Helper function to get lat/lon from a location name
-def get_lat_lon(location_name):
-    try:
-        location = geolocator.geocode(location_name, timeout=10)
-        if location:
-            return location.latitude, location.longitude
-        else:
-            return None, None
-    except Exception as e:
-        print(f"Error geocoding {location_name}: {e}")
-        return None, None
-
-# Step 1: Load feedback data
-with open('data/feedback_data.json', 'r') as file:
-    feedback_data = json.load(file)
 
-# Step 2: Analyze sentiment, emotion, category, and geocode location for each feedback entry
-results = []
-
-for feedback in feedback_data:
-    text = feedback["text"]
+def main():
+    args = parser.parse_args()
+    if args.stream and args.format != "json":
+        parser.error("--stream writes JSONL; use --format only without --stream")
+    if args.embeddings and args.format == "json":
+        parser.error("--embeddings requires --format parquet or arrow")
     
-    # Analyze sentiment, emotion, and category
-    sentiment, emotion, category = analyze_sentiment_and_categorize(text)
+    if args.emotion_backend:
+        # Set in the environment so spawned analysis workers pick the same backend
+        os.environ["EMOTION_BACKEND"] = args.emotion_backend
+    if os.environ.get("EMOTION_BACKEND") == "onnx":
+        # Export once up front rather than racing to do it in every worker
+        from modules.emotion_onnx import ensure_exported
+        from modules.hub import model_revision
+        from modules.sentiment_analysis import EMOTION_MODEL
+        ensure_exported(EMOTION_MODEL, revision=model_revision(EMOTION_MODEL))
     
-    # Geocode location
-    location_name = feedback["location"]
-    latitude, longitude = get_lat_lon(location_name)
+    # Every resource below is released on success and on error; the pool is terminated on error
+    with contextlib.ExitStack() as stack:
+        # Initialize geocoder (persistent cache -> Nominatim -> bundled gazetteer)
+        geocoder = Geocoder(offline=args.offline)
+        if args.geocode_workers > 0:
+            # Resolve locations on background threads while the models run
+            geocoder = ConcurrentGeocoder(geocoder, rate=args.geocode_rate, max_workers=args.geocode_workers)
+        stack.callback(geocoder.close)
+        
+        # Models load once per worker process; this process geocodes and writes results in input order
+        pool = stack.enter_context(AnalysisPool(args.workers, batch_size=args.batch_size)) if args.workers > 0 else None
+        
+        # Results of earlier runs, valid while the models and taxonomy are unchanged
+        cache = None if args.no_cache else AnalysisCache()
+        if cache is not None:
+            stack.callback(cache.close)
+        
+        def process(records):
+            return analyze_records(records, geocoder, batch_size=args.batch_size, pool=pool, cache=cache)
+        
+        if args.stream:
+            # Stream records through analysis and geocoding, appending JSONL as we go
+            output_path = args.output or "data/feedback_results_with_location.jsonl"
+            count = run_streaming(args.input, output_path, process, resume=args.resume)
+        elif args.format != "json":
+            # Write columnar batches, optionally with precomputed sentence embeddings
+            from modules.dataset import DEFAULT_ARROW_PATH, DEFAULT_PARQUET_PATH, DatasetWriter
+            output_path = args.output or (DEFAULT_PARQUET_PATH if args.format == "parquet" else DEFAULT_ARROW_PATH)
+            if args.embeddings:
+                from modules.embeddings import encode_texts
+            with DatasetWriter(output_path) as writer:
+                for batch in batched(process(iter_feedback(args.input)), 4096):
+                    embeddings = encode_texts([result["text"] for result in batch]) if args.embeddings else None
+                    writer.write(batch, embeddings)
+            count = writer.rows
+        else:
+            # Analyze everything, then save one JSON array
+            output_path = args.output or "data/feedback_results_with_location.json"
+            results = list(process(iter_feedback(args.input)))
+            with open(output_path, 'w') as file:
+                json.dump(results, file, indent=4)
+            count = len(results)
     
-    # Append the result with sentiment, emotion, category, and geolocation
-    results.append({
-        "text": text,
-        "user": feedback["user"],
-        "location": location_name,
-        "latitude": latitude,
-        "longitude": longitude,
-        "timestamp": feedback["timestamp"],
-        "sentiment": sentiment,
-        "emotion": emotion,
-        "category": category
-    })
+    print(f"Geocoder made {geocoder.remote_calls} remote calls")
+    if cache is not None:
+        print(f"Analysis cache: {cache.hits} reused, {cache.misses} analyzed")
+    print(f"Sentiment, Emotion, Categorization, and Geolocation Analysis Completed for {count} entries. Results saved in '{output_path}'")
 
-# Step 3: Save the results to a new JSON file
-with open('data/feedback_results_with_location.json', 'w') as file:
-    json.dump(results, file, indent=4)
 
-print("Sentiment, Emotion, Categorization, and Geolocation Analysis Completed. Results saved in 'feedback_results_with_location.json'")
+if __name__ == "__main__":
+    main()
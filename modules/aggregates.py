@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ('category', 'sentiment', 'emotion')
+
+
+class FeedbackCube:
+    """
+    Dense count cube of feedback per day x category x sentiment x emotion.
+
+    Built once per dataset; filtering and every chart total then work on the cube,
+    whose size depends on the number of distinct days and labels, not on rows.
+    """
+
+    def __init__(self, days, labels, counts):
+        self.days = days
+        self.labels = labels
+        self.counts = counts
+
+    @classmethod
+    def from_frame(cls, df):
+        df = df[df['timestamp'].notna()]
+        day_codes, days = pd.factorize(df['timestamp'].dt.floor('D'), sort=True)
+        codes = [day_codes]
+        labels = {}
+        for dimension in CUBE_DIMENSIONS:
+            dimension_codes, values = pd.factorize(df[dimension].astype(str), sort=True)
+            codes.append(dimension_codes)
+            labels[dimension] = list(values)
+        shape = (len(days),) + tuple(len(labels[dimension]) for dimension in CUBE_DIMENSIONS)
+        flat = np.ravel_multi_index(codes, shape) if len(df) else np.empty(0, dtype=np.int64)
+        counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+        return cls(days.to_numpy(dtype='datetime64[D]'), labels, counts)
+
+    def slice(self, start=None, end=None, **selected):
+        """
+        Sub-cube for an inclusive date range and allowed labels per dimension,
+        e.g. cube.slice(start, end, sentiment=['Positive'], category=[...]).
+        """
+        days = np.ones(len(self.days), dtype=bool)
+        if start is not None:
+            days &= self.days >= np.datetime64(start, 'D')
+        if end is not None:
+            days &= self.days <= np.datetime64(end, 'D')
+        counts = self.counts[days]
+        labels = dict(self.labels)
+        for axis, dimension in enumerate(CUBE_DIMENSIONS, start=1):
+            allowed = selected.get(dimension)
+            if allowed is None:
+                continue
+            allowed = {str(value) for value in allowed}
+            keep = np.array([label in allowed for label in self.labels[dimension]], dtype=bool)
+            counts = np.compress(keep, counts, axis=axis)
+            labels[dimension] = [label for label, kept in zip(self.labels[dimension], keep) if kept]
+        return FeedbackCube(self.days[days], labels, counts)
+
+    def total(self):
+        return int(self.counts.sum())
+
+    def count(self, dimension, label):
+        """Number of reports with one label of a dimension (0 if the label is absent)"""
+        if label not in self.labels[dimension]:
+            return 0
+        axis = CUBE_DIMENSIONS.index(dimension) + 1
+        return int(np.take(self.counts, self.labels[dimension].index(label), axis=axis).sum())
+
+    def totals(self, dimension):
+        """Counts per label of one dimension, largest first, without empty labels"""
+        axis = CUBE_DIMENSIONS.index(dimension) + 1
+        other = tuple(i for i in range(self.counts.ndim) if i != axis)
+        series = pd.Series(self.counts.sum(axis=other), index=pd.Index(self.labels[dimension], name=dimension), name='count')
+        return series[series > 0].sort_values(ascending=False, kind='stable')
+
+    def daily(self, dimension):
+        """Long-format DataFrame of (date, label, count) for non-empty days and labels"""
+        axis = CUBE_DIMENSIONS.index(dimension) + 1
+        other = tuple(i for i in range(1, self.counts.ndim) if i != axis)
+        grid = self.counts.sum(axis=other)
+        day_index, label_index = np.nonzero(grid)
+        return pd.DataFrame({
+            'date': self.days[day_index],
+            dimension: np.asarray(self.labels[dimension], dtype=object)[label_index],
+            'count': grid[day_index, label_index]
+        })
+
+
+if __name__ == "__main__":
+    # Cube build and slice timings: python -m modules.aggregates [rows]
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, n), unit='s'),
+        'category': rng.choice(['Health', 'Education', 'Infrastructure', 'Environment', 'Public Safety'], n),
+        'sentiment': rng.choice(['Positive', 'Neutral', 'Negative'], n),
+        'emotion': rng.choice(['joy', 'anger', 'fear', 'sadness', 'surprise', 'disgust', 'neutral'], n)
+    })
+    start = time.perf_counter()
+    cube = FeedbackCube.from_frame(frame)
+    print(f"cube {cube.counts.shape} from {n} rows in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    part = cube.slice('2024-03-01', '2024-09-30', sentiment=['Positive', 'Negative'], category=['Health', 'Education'])
+    part.totals('sentiment'), part.totals('category'), part.daily('category'), part.count('sentiment', 'Positive')
+    sliced = time.perf_counter() - start
+    start = time.perf_counter()
+    mask = (
+        frame['sentiment'].isin(['Positive', 'Negative']) & frame['category'].isin(['Health', 'Education'])
+        & (frame['timestamp'].dt.date >= pd.Timestamp('2024-03-01').date())
+        & (frame['timestamp'].dt.date <= pd.Timestamp('2024-09-30').date())
+    )
+    subset = frame[mask]
+    subset['sentiment'].value_counts(), subset['category'].value_counts(), len(subset[subset['sentiment'] == 'Positive'])
+    scanned = time.perf_counter() - start
+    assert part.total() == len(subset)
+    print(f"filter + chart totals: cube {sliced * 1000:.1f} ms, row scan {scanned * 1000:.0f} ms")
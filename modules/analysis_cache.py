@@ -0,0 +1,86 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_ANALYSIS_CACHE_PATH = 'data/analysis_cache.sqlite'
+
+# Rows written under other analysis versions are kept this long, so switching the
+# emotion backend or rolling back a model reuses them instead of re-analyzing
+DEFAULT_STALE_TTL = 30 * 24 * 3600
+
+
+class AnalysisCache:
+    """
+    Persistent SQLite cache of sentiment, emotion and category per feedback text.
+
+    Entries are keyed by a hash of the analysis version and the text, so editing a
+    text, changing the emotion model or editing the keyword taxonomy all miss the
+    cache. Rows written under other versions are pruned once older than stale_ttl.
+    """
+
+    def __init__(self, path=DEFAULT_ANALYSIS_CACHE_PATH, version=None, stale_ttl=DEFAULT_STALE_TTL):
+        if version is None:
+            from modules.sentiment_analysis import analysis_version
+            version = analysis_version()
+        self.path = path
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis ("
+            " key TEXT PRIMARY KEY,"
+            " version TEXT NOT NULL,"
+            " sentiment TEXT,"
+            " emotion TEXT,"
+            " category TEXT,"
+            " analyzed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "DELETE FROM analysis WHERE version != ? AND analyzed_at < ?",
+            (version, time.time() - stale_ttl)
+        )
+        self._conn.commit()
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.version}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """Return {key: (sentiment, emotion, category)} for the keys that are cached"""
+        found = {}
+        keys = list(keys)
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, sentiment, emotion, category FROM analysis WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+            for key, sentiment, emotion, category in rows:
+                found[key] = (sentiment, emotion, category)
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store an iterable of (key, sentiment, emotion, category) rows"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO analysis (key, version, sentiment, emotion, category, analyzed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, self.version, sentiment, emotion, category, now) for key, sentiment, emotion, category in items]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'category_keywords.json')
+UNCATEGORIZED = "Uncategorized"
+
+
+def load_taxonomy(path=DEFAULT_TAXONOMY_PATH):
+    """Load an ordered {category: [keywords]} mapping from JSON"""
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _normalize_keyword(keyword):
+    return " ".join(keyword.lower().split())
+
+
+def _trie_regex(keywords):
+    """
+    Build one regex from a keyword trie, so shared prefixes are matched once and the
+    engine never retries every keyword at every position.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def render(node):
+        terminal = "" in node
+        branches = []
+        for char in sorted(key for key in node if key):
+            token = r"\s+" if char == " " else re.escape(char)
+            branches.append(token + render(node[char]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Longer keywords win because the optional tail is greedy
+            return "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+class KeywordCategorizer:
+    """
+    Precompiled multi-keyword categorizer.
+
+    All keywords are compiled into a single trie-shaped regex anchored at word starts.
+    With whole_words=False a keyword also matches longer words it prefixes
+    ("pothole" -> "potholes"); with whole_words=True it must end on a word boundary.
+    Each match adds one point to every category listing the keyword, and the best
+    scoring category wins, ties going to the category listed first in the taxonomy.
+    """
+
+    def __init__(self, taxonomy, whole_words=False):
+        self.categories = list(taxonomy)
+        self.whole_words = whole_words
+        self._keyword_categories = {}
+        for index, keywords in enumerate(taxonomy.values()):
+            for keyword in keywords:
+                keyword = _normalize_keyword(keyword)
+                if keyword:
+                    self._keyword_categories.setdefault(keyword, []).append(index)
+
+        tail = r"\b" if whole_words else ""
+        self.pattern = re.compile(r"\b(?:" + _trie_regex(self._keyword_categories) + ")" + tail)
+
+        fingerprint = json.dumps([taxonomy, whole_words], sort_keys=True)
+        self.version = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:12]
+
+    def _match_categories(self, match):
+        return self._keyword_categories.get(_normalize_keyword(match), ())
+
+    def score(self, feedback):
+        """Return {category: keyword hits} for every matching category"""
+        scores = {}
+        for match in self.pattern.findall(feedback.lower()):
+            for index in self._match_categories(match):
+                category = self.categories[index]
+                scores[category] = scores.get(category, 0) + 1
+        return scores
+
+    def categorize(self, feedback):
+        scores = self.score(feedback)
+        if not scores:
+            return UNCATEGORIZED
+        # max() keeps the first maximum, i.e. taxonomy order breaks ties
+        return max(self.categories, key=lambda category: scores.get(category, 0))
+
+    def score_series(self, texts):
+        """Vectorized scoring over a pandas Series; returns a rows x categories DataFrame of hit counts"""
+        import numpy as np
+        import pandas as pd
+
+        matches = texts.fillna("").astype(str).str.lower().str.findall(self.pattern)
+        matches = matches.reset_index(drop=True).explode().dropna()
+        category_index = matches.map(self._match_categories).explode().dropna()
+
+        scores = np.zeros((len(texts), len(self.categories)), dtype=np.int32)
+        np.add.at(
+            scores,
+            (category_index.index.to_numpy(), category_index.to_numpy(dtype=np.int64)),
+            1
+        )
+        return pd.DataFrame(scores, index=texts.index, columns=self.categories)
+
+    def categorize_series(self, texts):
+        """Vectorized categorize() over a pandas Series"""
+        import numpy as np
+        import pandas as pd
+
+        scores = self.score_series(texts).to_numpy()
+        labels = np.array(self.categories + [UNCATEGORIZED], dtype=object)
+        best = np.where(scores.max(axis=1) > 0, scores.argmax(axis=1), len(self.categories))
+        return pd.Series(labels[best], index=texts.index, name="category")
+
+
+_default_categorizer = None
+_default_lock = threading.Lock()
+
+
+def get_default_categorizer():
+    """Return the categorizer built from the bundled taxonomy, compiling it once per process"""
+    global _default_categorizer
+    if _default_categorizer is None:
+        with _default_lock:
+            if _default_categorizer is None:
+                _default_categorizer = KeywordCategorizer(load_taxonomy())
+    return _default_categorizer
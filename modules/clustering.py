@@ -1,95 +1,344 @@
+import threading
+import time
+
 import numpy as np
 import pandas as pd
 from sklearn.cluster import DBSCAN, KMeans
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
+from modules.embeddings import encode_texts
+from modules.incremental_clustering import IncrementalSpatialClusterer
+from modules.similarity import SimilarityIndex, near_duplicate_groups
+from modules.spatial_index import EARTH_RADIUS_KM
 from sklearn.preprocessing import StandardScaler
-from geopy.distance import geodesic
 
 def calculate_spatial_radius(coords, max_radius_km=5):
     """Calculate appropriate epsilon for DBSCAN based on desired max radius"""
     # Convert km to radians (approx. for Earth's radius)
-    return max_radius_km / 6371.0
+    return max_radius_km / EARTH_RADIUS_KM
 
-def perform_clustering(df, max_radius_km=5, min_samples=3):
-    """Perform spatio-textual clustering with predefined categories"""
-    
-    # Filter out entries without location data
+# Text sub-clusters per spatial cluster, and KMeans restarts per fit
+MAX_SUB_CLUSTERS = 3
+KMEANS_N_INIT = 1
+
+# Predefined categories
+VALID_CATEGORIES = ['Health', 'Education', 'Infrastructure', 'Environment', 'Public Safety']
+
+
+def _located(df):
+    """Reports with coordinates and one of the predefined categories"""
     df = df.dropna(subset=['latitude', 'longitude'])
+    return df[df['category'].isin(VALID_CATEGORIES)]
+
+
+def _text_embeddings(member_df, embeddings=None):
+    """Precomputed rows for member_df's index labels, or texts embedded with the cached model"""
+    if embeddings is not None:
+        return np.asarray(embeddings[member_df.index.to_numpy()], dtype=np.float32)
+    return encode_texts(member_df['text'].tolist(), batch_size=32)
+
+
+def _split_by_content(features):
+    """Sub-cluster labels numbered from 0 for the combined features of one spatial cluster"""
+    if len(features) <= MAX_SUB_CLUSTERS:
+        # As many clusters as points: every point is its own sub-cluster
+        return np.arange(len(features))
+    kmeans = KMeans(n_clusters=MAX_SUB_CLUSTERS, n_init=KMEANS_N_INIT, random_state=42)
+    _, sub_clusters = np.unique(kmeans.fit_predict(features), return_inverse=True)
+    return sub_clusters
+
+
+def _summarize(df, final_clusters):
+    """Center, size, main issue and most frequent category per cluster"""
+    clustered = df.assign(cluster=final_clusters)
+    clustered = clustered[clustered['cluster'] != -1]
+    grouped = clustered.groupby('cluster', sort=True)
+    cluster_summaries = grouped.agg(
+        center_lat=('latitude', 'mean'),
+        center_lon=('longitude', 'mean'),
+        count=('text', 'size'),
+        main_issue=('text', 'first')
+    )
+    # Most frequent category per cluster, ties going to the first name alphabetically like Series.mode
+    category_counts = clustered.assign(category=clustered['category'].astype(str))
+    category_counts = category_counts.groupby(['cluster', 'category']).size().reset_index(name='n')
+    category_counts = category_counts.sort_values(['cluster', 'n', 'category'], ascending=[True, False, True])
+    cluster_summaries['category'] = category_counts.drop_duplicates('cluster').set_index('cluster')['category']
+    cluster_summaries['main_issue'] = cluster_summaries['main_issue'].astype(str).str.slice(0, 100) + "..."
+    return cluster_summaries.rename_axis('cluster_id').reset_index()[
+        ['cluster_id', 'center_lat', 'center_lon', 'category', 'count', 'main_issue']
+    ]
+
+
+def perform_clustering(df, max_radius_km=5, min_samples=3, embeddings=None, refine='kmeans',
+                       similarity_threshold=0.85, progress=None):
+    """
+    Perform spatio-textual clustering with predefined categories.
+
+    embeddings, if given, is a precomputed (rows x dim) matrix for the full dataset,
+    indexed by the integer labels of df.index; otherwise texts are embedded on the fly.
+    refine picks how spatial clusters are split by content: 'kmeans' into up to three
+    groups on combined text, location and category features, or 'similarity' into
+    groups of near-duplicate reports (cosine >= similarity_threshold) found through
+    an approximate nearest-neighbour index.
+    Seconds spent per stage are reported in df.attrs['timings'].
+    progress, if given, is called as progress(fraction, message) as the stages advance;
+    an exception raised from it aborts the run (used to cancel background jobs).
+    """
+    timings = {}
+    stage_start = time.perf_counter()
+
+    def lap(stage):
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[stage] = now - stage_start
+        stage_start = now
+
+    def report(fraction, message):
+        if progress is not None:
+            progress(fraction, message)
     
-    # Predefined categories
-    VALID_CATEGORIES = ['Health', 'Education', 'Infrastructure', 'Environment', 'Public Safety']
-    df = df[df['category'].isin(VALID_CATEGORIES)]
-    
-    if len(df) < min_samples:
-        return df.assign(cluster=-1)
-    
-    # 1. Text Embedding
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    text_embeddings = model.encode(df['text'].tolist(), batch_size=32, show_progress_bar=False)
-    
-    # 2. Category Encoding
-    category_encoded = pd.get_dummies(df['category']).values
+    report(0.0, "Finding spatial clusters")
     
-    # 3. Location Data (in radians for DBSCAN)
-    coords = np.radians(df[['latitude', 'longitude']].values)
+    # Filter out entries without location data or a predefined category
+    df = _located(df)
     
-    # 4. Combine Features
-    scaler = StandardScaler()
-    text_scaled = scaler.fit_transform(text_embeddings)
+    if len(df) < min_samples:
+        df = df.assign(cluster=-1)
+        df.attrs['cluster_summaries'] = pd.DataFrame()
+        df.attrs['timings'] = timings
+        return df
     
-    # Weight features: 50% text, 30% location, 20% category
-    combined_features = np.hstack([
-        text_scaled * 0.5,
-        coords * 0.3,
-        category_encoded * 0.2
-    ])
+    # 1. Location Data (in radians for DBSCAN)
+    coords = np.radians(df[['latitude', 'longitude']].to_numpy(dtype=float))
     
-    # 5. DBSCAN Clustering
+    # 2. DBSCAN Clustering on location only
     eps = calculate_spatial_radius(coords, max_radius_km)
-    dbscan = DBSCAN(eps=eps, min_samples=min_samples, metric='haversine', n_jobs=-1)
-    clusters = dbscan.fit_predict(coords)  # Cluster primarily on location
+    dbscan = DBSCAN(eps=eps, min_samples=min_samples, metric='haversine', algorithm='ball_tree', n_jobs=-1)
+    clusters = dbscan.fit_predict(coords)
+    lap('spatial')
+    report(0.3, "Embedding report texts")
     
-    # Refine clusters based on text and category similarity
+    # Text and category features are only needed for points inside a spatial cluster
+    members = np.flatnonzero(clusters != -1)
     final_clusters = np.full(len(df), -1, dtype=int)
-    current_cluster = 0
-    
-    for cluster_id in np.unique(clusters):
-        if cluster_id == -1:
-            continue
-            
-        cluster_idx = np.where(clusters == cluster_id)[0]
-        cluster_features = combined_features[cluster_idx]
+    if len(members):
+        member_df = df.iloc[members]
+        
+        # 3. Text Embedding (precomputed at ingest, or cached model with each distinct text encoded once)
+        text_embeddings = _text_embeddings(member_df, embeddings)
+        lap('embedding')
+        report(0.5, "Splitting areas by content")
         
-        # Sub-cluster within spatial cluster based on content
-        kmeans = KMeans(n_clusters=min(len(cluster_idx), 3), random_state=42)
-        sub_clusters = kmeans.fit_predict(cluster_features)
+        member_clusters = clusters[members]
+        if refine == 'similarity':
+            # 4-5. Link near-duplicate reports within each spatial cluster
+            index = SimilarityIndex(text_embeddings)
+            groups = near_duplicate_groups(index, similarity_threshold, within=member_clusters)
+            # Number sub-clusters by spatial cluster, then by first appearance
+            _, final_clusters[members] = np.unique(member_clusters * len(members) + groups, return_inverse=True)
+        else:
+            # 4. Combine Features, weighted 50% text, 30% location, 20% category
+            category_encoded = pd.get_dummies(member_df['category']).to_numpy(dtype=np.float32)
+            text_scaled = StandardScaler().fit_transform(text_embeddings)
+            combined_features = np.hstack([
+                text_scaled * 0.5,
+                coords[members] * 0.3,
+                category_encoded * 0.2
+            ])
+            lap('features')
         
-        for sub_id in np.unique(sub_clusters):
-            sub_idx = cluster_idx[sub_clusters == sub_id]
-            final_clusters[sub_idx] = current_cluster
-            current_cluster += 1
+            # 5. Refine clusters based on text and category similarity
+            order = np.argsort(member_clusters, kind='stable')
+            bounds = np.flatnonzero(np.diff(member_clusters[order])) + 1
+            current_cluster = 0
+            spatial_groups = np.split(order, bounds)
+            for done, group in enumerate(spatial_groups):
+                if done % 100 == 0:
+                    report(0.5 + 0.45 * done / len(spatial_groups),
+                           f"Splitting areas by content ({done}/{len(spatial_groups)})")
+                sub_clusters = _split_by_content(combined_features[group])
+                final_clusters[members[group]] = current_cluster + sub_clusters
+                current_cluster += sub_clusters.max() + 1
+        lap('refinement')
+    report(0.95, "Summarizing clusters")
     
+    cluster_summaries = _summarize(df, final_clusters)
     df = df.assign(cluster=final_clusters)
+    lap('summaries')
     
-    # Add cluster summaries
-    cluster_summaries = []
-    for cluster_id in np.unique(final_clusters):
-        if cluster_id == -1:
-            continue
-        cluster_data = df[df['cluster'] == cluster_id]
-        center = (
-            cluster_data['latitude'].mean(),
-            cluster_data['longitude'].mean()
-        )
-        cluster_summaries.append({
-            'cluster_id': cluster_id,
-            'center_lat': center[0],
-            'center_lon': center[1],
-            'category': cluster_data['category'].mode()[0],
-            'count': len(cluster_data),
-            'main_issue': cluster_data['text'].iloc[0][:100] + "..."
-        })
-    
-    df.attrs['cluster_summaries'] = pd.DataFrame(cluster_summaries)
-    return df
\ No newline at end of file
+    df.attrs['cluster_summaries'] = cluster_summaries
+    df.attrs['timings'] = timings
+    return df
+
+
+class IncrementalClustering:
+    """
+    KMeans-refined clustering of a report set that grows between runs.
+
+    Spatial clusters are kept in an IncrementalSpatialClusterer and each area's
+    content split is remembered by its stable cluster id. When update() gets the
+    reports of the previous call (same index labels, coordinates and categories,
+    in the same order) followed by new ones, only the new reports are inserted and
+    only the areas that gained reports or merged are split by content again; every
+    other area keeps its sub-clusters. Any other change triggers a full fit. Text
+    embeddings are standardized with the scaler fitted at the last full fit, so
+    after updates the sub-clusters can differ slightly from a fresh run.
+    """
+
+    def __init__(self, max_radius_km=5, min_samples=3):
+        self.max_radius_km = max_radius_km
+        self.min_samples = min_samples
+        self._spatial = IncrementalSpatialClusterer(max_radius_km, min_samples)
+        self._rows = None
+        self._points = None
+        self._categories = None
+        self._scaler = None
+        self._splits = {}
+        self._lock = threading.Lock()
+
+    def _extends_previous(self, rows, points, categories):
+        if self._rows is None or len(rows) < len(self._rows):
+            return False
+        n = len(self._rows)
+        return (np.array_equal(rows[:n], self._rows) and np.array_equal(points[:n], self._points)
+                and np.array_equal(categories[:n], self._categories))
+
+    def update(self, df, embeddings=None, progress=None):
+        """
+        Same result layout as perform_clustering(df, refine='kmeans'). df.attrs['resplit_areas']
+        counts the areas whose content split was recomputed by this call.
+        """
+        with self._lock:
+            try:
+                return self._update(df, embeddings, progress)
+            except BaseException:
+                # A cancelled or failed update leaves partial state behind: fit from scratch next time
+                self._rows = None
+                raise
+
+    def _update(self, df, embeddings, progress):
+        timings = {}
+        stage_start = time.perf_counter()
+
+        def lap(stage):
+            nonlocal stage_start
+            now = time.perf_counter()
+            timings[stage] = now - stage_start
+            stage_start = now
+
+        def report(fraction, message):
+            if progress is not None:
+                progress(fraction, message)
+
+        report(0.0, "Finding spatial clusters")
+        df = _located(df)
+        rows = df.index.to_numpy()
+        points = df[['latitude', 'longitude']].to_numpy(dtype=float)
+        categories = df['category'].astype(str).to_numpy()
+
+        # 1. Insert appended reports, or cluster everything again
+        if self._extends_previous(rows, points, categories):
+            added = points[len(self._rows):]
+            changed, merged = self._spatial.insert(added[:, 0], added[:, 1])
+            for absorbed in merged:
+                self._splits.pop(absorbed, None)
+            stale = changed | set(merged.values())
+        else:
+            self._spatial.fit(points[:, 0], points[:, 1])
+            self._scaler = None
+            self._splits = {}
+            stale = None
+        self._rows, self._points, self._categories = rows, points, categories
+        clusters = self._spatial.labels()
+        lap('spatial')
+        report(0.3, "Embedding report texts")
+
+        members = np.flatnonzero(clusters != -1)
+        order = members[np.argsort(clusters[members], kind='stable')]
+        spatial_groups = np.split(order, np.flatnonzero(np.diff(clusters[order])) + 1) if len(order) else []
+        ids = [int(clusters[group[0]]) for group in spatial_groups]
+        resplit = [i for i, cluster_id in enumerate(ids)
+                   if stale is None or cluster_id in stale or cluster_id not in self._splits]
+
+        # 2. Features of the areas to split again, weighted 50% text, 30% location, 20% category
+        if resplit:
+            resplit_rows = np.concatenate([spatial_groups[i] for i in resplit])
+            text_embeddings = _text_embeddings(df.iloc[resplit_rows], embeddings)
+            lap('embedding')
+            report(0.5, "Splitting areas by content")
+            if self._scaler is None:
+                self._scaler = StandardScaler().fit(text_embeddings)
+            category_encoded = categories[resplit_rows][:, None] == np.array(VALID_CATEGORIES)
+            combined_features = np.hstack([
+                self._scaler.transform(text_embeddings) * 0.5,
+                np.radians(points[resplit_rows]) * 0.3,
+                category_encoded.astype(np.float32) * 0.2
+            ])
+            lap('features')
+
+            # 3. Refine only those areas
+            start = 0
+            for done, i in enumerate(resplit):
+                if done % 100 == 0:
+                    report(0.5 + 0.45 * done / len(resplit), f"Splitting areas by content ({done}/{len(resplit)})")
+                size = len(spatial_groups[i])
+                self._splits[ids[i]] = _split_by_content(combined_features[start:start + size])
+                start += size
+            lap('refinement')
+        report(0.95, "Summarizing clusters")
+
+        # Number sub-clusters by spatial cluster id, as perform_clustering does
+        final_clusters = np.full(len(df), -1, dtype=int)
+        current_cluster = 0
+        for cluster_id, group in zip(ids, spatial_groups):
+            sub_clusters = self._splits[cluster_id]
+            final_clusters[group] = current_cluster + sub_clusters
+            current_cluster += sub_clusters.max() + 1
+        cluster_summaries = _summarize(df, final_clusters)
+        df = df.assign(cluster=final_clusters)
+        lap('summaries')
+
+        df.attrs['cluster_summaries'] = cluster_summaries
+        df.attrs['timings'] = timings
+        df.attrs['resplit_areas'] = len(resplit)
+        return df
+
+
+if __name__ == "__main__":
+    # Stage timings on synthetic reports: python -m modules.clustering [rows]
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    centers = np.column_stack([rng.uniform(8, 34, 500), rng.uniform(68, 92, 500)])
+    points = centers[rng.integers(0, len(centers), n)] + rng.normal(0, 0.03, (n, 2))
+    frame = pd.DataFrame({
+        'latitude': points[:, 0],
+        'longitude': points[:, 1],
+        'category': rng.choice(['Health', 'Education', 'Infrastructure', 'Environment', 'Public Safety'], n),
+        'text': [f"Synthetic report {i}" for i in range(n)]
+    })
+    # Random vectors stand in for MiniLM embeddings so the benchmark needs no model
+    vectors = rng.normal(size=(n, 384)).astype(np.float32)
+
+    start = time.perf_counter()
+    result = perform_clustering(frame, embeddings=vectors)
+    total = time.perf_counter() - start
+    print(f"{n} reports, {len(result.attrs['cluster_summaries'])} clusters in {total:.2f} s")
+    for stage, seconds in result.attrs['timings'].items():
+        print(f"{stage:>12}: {seconds:6.2f} s")
+
+    # Appending reports: a full recompute against an incremental update of the previous run
+    base = n - 100
+    incremental = IncrementalClustering()
+    incremental.update(frame.iloc[:base], embeddings=vectors)
+    start = time.perf_counter()
+    updated = incremental.update(frame, embeddings=vectors)
+    update_time = time.perf_counter() - start
+    start = time.perf_counter()
+    fresh = IncrementalClustering().update(frame, embeddings=vectors)
+    fresh_time = time.perf_counter() - start
+    assert np.array_equal(updated['cluster'] == -1, fresh['cluster'] == -1)
+    print(f"100 appended reports: update {update_time:.2f} s ({updated.attrs['resplit_areas']} of "
+          f"{fresh.attrs['resplit_areas']} areas split again), full fit {fresh_time:.2f} s, "
+          f"perform_clustering {total:.2f} s")
@@ -0,0 +1,325 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEFAULT_PARQUET_PATH = 'data/feedback_results.parquet'
+DEFAULT_ARROW_PATH = 'data/feedback_results.arrow'
+
+# Arrow IPC copies of JSON exports, memory-mapped by load_frame
+DEFAULT_FRAME_CACHE_DIR = 'data/cache'
+
+# Resident memory allowed after load_frame of a 1M-row cached dataset (see --benchmark-load)
+LOAD_MEMORY_BUDGET = 256 * 2**20
+
+# Low-cardinality columns, read back from Parquet as dictionary (pandas category) columns
+DICTIONARY_COLUMNS = ['location', 'sentiment', 'emotion', 'category']
+EMBEDDING_COLUMN = 'embedding'
+
+
+def _is_arrow_ipc(path):
+    return os.path.splitext(path)[1] in ('.arrow', '.feather', '.ipc')
+
+
+def parse_timestamps(values):
+    """
+    Timestamps as naive UTC datetimes. ISO 8601 strings with a zone ("...Z",
+    "+05:30") are converted to UTC; strings without one are taken as UTC already.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        parsed = values if values.dt.tz is None else values.dt.tz_convert('UTC')
+    else:
+        parsed = pd.to_datetime(values.astype(object), utc=True, format='ISO8601')
+    return parsed.dt.tz_localize(None) if parsed.dt.tz is not None else parsed
+
+
+def _records_to_batch(records, embeddings=None, embedding_dtype=np.float16):
+    """Build a RecordBatch from result dicts plus an optional (rows x dim) embedding matrix"""
+    columns = {
+        'text': pa.array([r['text'] for r in records], pa.string()),
+        'user': pa.array([r['user'] for r in records], pa.string()),
+        'location': pa.array([r['location'] for r in records], pa.string()),
+        'latitude': pa.array([r['latitude'] for r in records], pa.float64()),
+        'longitude': pa.array([r['longitude'] for r in records], pa.float64()),
+        'timestamp': pa.array(parse_timestamps([r['timestamp'] for r in records]).dt.floor('s'), pa.timestamp('s')),
+        'sentiment': pa.array([r['sentiment'] for r in records], pa.string()),
+        'emotion': pa.array([r['emotion'] for r in records], pa.string()),
+        'category': pa.array([r['category'] for r in records], pa.string()),
+    }
+    if embeddings is not None:
+        embeddings = np.ascontiguousarray(embeddings, dtype=embedding_dtype)
+        columns[EMBEDDING_COLUMN] = pa.FixedSizeListArray.from_arrays(
+            pa.array(embeddings.ravel()), embeddings.shape[1]
+        )
+    return pa.RecordBatch.from_pydict(columns)
+
+
+class DatasetWriter:
+    """
+    Incrementally writes analysis results to a columnar file, one batch at a time.
+
+    The format follows the extension: .parquet for compact storage, .arrow/.feather
+    for uncompressed Arrow IPC that can be memory-mapped without decoding.
+    """
+
+    def __init__(self, path, embedding_dtype=np.float16):
+        self.path = path
+        self.embedding_dtype = embedding_dtype
+        self.rows = 0
+        self._writer = None
+
+    def write(self, records, embeddings=None):
+        if not records:
+            return
+        batch = _records_to_batch(records, embeddings, self.embedding_dtype)
+        if self._writer is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if _is_arrow_ipc(self.path):
+                self._writer = pa.ipc.new_file(self.path, batch.schema)
+            else:
+                self._writer = pq.ParquetWriter(self.path, batch.schema)
+        if _is_arrow_ipc(self.path):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(pa.Table.from_batches([batch]))
+        self.rows += len(records)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_table(path, columns=None):
+    """Read a columnar results file, memory-mapping it where the format allows"""
+    if _is_arrow_ipc(path):
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        return table.select(columns) if columns is not None else table
+    return pq.read_table(path, columns=columns, memory_map=True, read_dictionary=DICTIONARY_COLUMNS)
+
+
+def read_dataset(path):
+    """Load everything except the embedding column as a pandas DataFrame"""
+    if _is_arrow_ipc(path):
+        schema = pa.ipc.open_file(pa.memory_map(path, 'r')).schema
+    else:
+        schema = pq.read_schema(path)
+    columns = [name for name in schema.names if name != EMBEDDING_COLUMN]
+    return read_table(path, columns).to_pandas(types_mapper=_arrow_strings)
+
+
+def has_embeddings(path):
+    if _is_arrow_ipc(path):
+        return EMBEDDING_COLUMN in pa.ipc.open_file(pa.memory_map(path, 'r')).schema.names
+    return EMBEDDING_COLUMN in pq.read_schema(path).names
+
+
+class ChunkedEmbeddings:
+    """
+    Read-only (rows x dim) view over an embedding column stored in several record
+    batches. Each chunk stays a zero-copy view into the memory-mapped file; indexing
+    with row numbers gathers just those rows. np.asarray() copies the whole matrix.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.offsets = np.cumsum([0] + [len(chunk) for chunk in chunks])
+        self.shape = (int(self.offsets[-1]), chunks[0].shape[1])
+        self.dtype = chunks[0].dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, rows):
+        if isinstance(rows, (int, np.integer)):
+            chunk = np.searchsorted(self.offsets, rows, side='right') - 1
+            return self.chunks[chunk][rows - self.offsets[chunk]]
+        rows = np.arange(len(self))[rows] if isinstance(rows, slice) else np.asarray(rows, dtype=np.int64)
+        result = np.empty((len(rows), self.shape[1]), dtype=self.dtype)
+        chunk_of_row = np.searchsorted(self.offsets, rows, side='right') - 1
+        for chunk in np.unique(chunk_of_row):
+            selected = chunk_of_row == chunk
+            result[selected] = self.chunks[chunk][rows[selected] - self.offsets[chunk]]
+        return result
+
+    def __array__(self, dtype=None):
+        matrix = np.concatenate(self.chunks)
+        return matrix if dtype is None else matrix.astype(dtype, copy=False)
+
+
+def load_embeddings(path):
+    """
+    Return the embedding column as a (rows x dim) array-like. For Arrow IPC files
+    the chunks are zero-copy views into the memory-mapped file: a file written in
+    one batch gives a plain NumPy array, several batches a ChunkedEmbeddings view
+    that never copies the whole matrix unless asked to.
+    """
+    column = read_table(path, [EMBEDDING_COLUMN]).column(EMBEDDING_COLUMN)
+    dim = column.type.list_size
+    chunks = [
+        chunk.flatten().to_numpy(zero_copy_only=False).reshape(-1, dim)
+        for chunk in column.chunks
+        if len(chunk)
+    ]
+    if len(chunks) == 1:
+        return chunks[0]
+    if not chunks:
+        return np.empty((0, dim), dtype=np.float32)
+    return ChunkedEmbeddings(chunks)
+
+
+def _arrow_strings(dtype):
+    # Free text stays in Arrow buffers (memory-mapped when the file is) instead of Python objects
+    if dtype in (pa.string(), pa.large_string()):
+        return pd.StringDtype('pyarrow')
+    return None
+
+
+def optimize_frame(df):
+    """
+    Compact dtypes for the app: category labels, float32 coordinates, parsed
+    timestamps and Arrow-backed text. Works in place and returns df.
+    """
+    for column in DICTIONARY_COLUMNS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    for column in ('latitude', 'longitude'):
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(np.float32)
+    if 'timestamp' in df:
+        df['timestamp'] = parse_timestamps(df['timestamp']).to_numpy()
+    for column in ('text', 'user'):
+        if column in df and df[column].dtype != pd.StringDtype('pyarrow'):
+            df[column] = df[column].astype(pd.StringDtype('pyarrow'))
+    return df
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {b'source_size': str(stat.st_size).encode(), b'source_mtime_ns': str(stat.st_mtime_ns).encode()}
+
+
+def frame_cache_path(path, cache_dir=DEFAULT_FRAME_CACHE_DIR):
+    """Cache file for path; the hash keeps same-named inputs in different directories apart"""
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}-{digest}.arrow")
+
+
+def _read_frame_cache(cache_path, fingerprint):
+    """Memory-mapped cached frame, or None if missing or built from another version of the source"""
+    if not os.path.exists(cache_path):
+        return None
+    reader = pa.ipc.open_file(pa.memory_map(cache_path, 'r'))
+    metadata = reader.schema.metadata or {}
+    if any(metadata.get(key) != value for key, value in fingerprint.items()):
+        return None
+    return reader.read_all().to_pandas(types_mapper=_arrow_strings)
+
+
+def _write_frame_cache(df, cache_path, fingerprint):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **fingerprint})
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    # Write to a temporary name and rename, so readers never see a partial file
+    tmp_path = cache_path + '.tmp'
+    with pa.ipc.new_file(tmp_path, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, cache_path)
+
+
+def load_frame(path, cache_dir=DEFAULT_FRAME_CACHE_DIR):
+    """
+    Load a results file (JSON export, Parquet or Arrow) as a DataFrame in compact dtypes.
+
+    JSON is parsed once and stored as Arrow IPC under cache_dir; later loads
+    memory-map that copy. The cache records the size and mtime of the JSON file
+    and is rebuilt whenever either changes.
+    """
+    if path.endswith('.json'):
+        fingerprint = _fingerprint(path)
+        cache_path = frame_cache_path(path, cache_dir)
+        df = _read_frame_cache(cache_path, fingerprint)
+        if df is None:
+            df = optimize_frame(pd.read_json(path, dtype=False))
+            _write_frame_cache(df, cache_path, fingerprint)
+            df = _read_frame_cache(cache_path, fingerprint)
+        return df
+    return optimize_frame(read_dataset(path))
+
+
+def _load_stats(path, mode):
+    """Run one load in a fresh interpreter; returns (seconds, resident bytes after loading, frame bytes)"""
+    import json
+    import subprocess
+    import sys
+    code = (
+        "import json, resource, time; import pandas as pd; "
+        "from modules.dataset import load_frame; "
+        "start = time.perf_counter(); "
+        + ("df = pd.read_json(PATH); df['timestamp'] = pd.to_datetime(df['timestamp']); "
+           if mode == 'json' else "df = load_frame(PATH, CACHE); ")
+        + "elapsed = time.perf_counter() - start; "
+        # ru_maxrss would include the parent's pages from before exec, so read the current RSS
+        "print(json.dumps([elapsed, int(open('/proc/self/statm').read().split()[1]) * resource.getpagesize(), "
+        "int(df.memory_usage(deep=True).sum())]))"
+    ).replace('PATH', repr(path)).replace('CACHE', repr(os.path.join(os.path.dirname(path), 'cache')))
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=project_root, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    # Load time and memory of the JSON export vs the cached columnar frame:
+    # python -m modules.dataset --benchmark-load [rows]
+    import json
+    import sys
+    import tempfile
+
+    if "--benchmark-load" in sys.argv:
+        position = sys.argv.index("--benchmark-load")
+        n = int(sys.argv[position + 1]) if len(sys.argv) > position + 1 else 1_000_000
+        rng = np.random.default_rng(0)
+        locations = [f"Sector {i}, Chandigarh" for i in range(300)]
+        start = pd.Timestamp('2024-01-01')
+        seconds = rng.integers(0, 365 * 24 * 3600, n)
+        records = [
+            {
+                'text': f"Report {i} about potholes and streetlights near sector {i % 300}",
+                'user': f"user{i % 50000}",
+                'location': locations[i % 300],
+                'latitude': float(30.7 + rng_lat),
+                'longitude': float(76.7 + rng_lon),
+                'timestamp': str(start + pd.Timedelta(seconds=int(second))),
+                'sentiment': ('Positive', 'Neutral', 'Negative')[i % 3],
+                'emotion': ('joy', 'anger', 'fear', 'sadness', 'neutral')[i % 5],
+                'category': ('Health', 'Education', 'Infrastructure', 'Environment')[i % 4]
+            }
+            for i, (rng_lat, rng_lon, second) in enumerate(zip(rng.random(n) / 10, rng.random(n) / 10, seconds))
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'feedback_results_with_location.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(records, file)
+            del records
+            results = {
+                'read_json': _load_stats(path, 'json'),
+                'load_frame (cold)': _load_stats(path, 'frame'),
+                'load_frame (cached)': _load_stats(path, 'frame')
+            }
+        for name, (elapsed, rss, frame_bytes) in results.items():
+            print(f"{name:>20}: {elapsed:6.2f} s, RSS {rss / 2**20:6.0f} MB, frame {frame_bytes / 2**20:6.0f} MB")
+        resident = results['load_frame (cached)'][1]
+        print(f"cached load RSS {resident / 2**20:.0f} MB (budget {LOAD_MEMORY_BUDGET / 2**20:.0f} MB at 1M rows)")
+        sys.exit(0 if n > 1_000_000 or resident <= LOAD_MEMORY_BUDGET else 1)
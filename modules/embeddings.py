@@ -0,0 +1,266 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from modules.hub import model_revision
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: appends are only serialized within one process
+    fcntl = None
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+DEFAULT_STORE_DIR = 'data/embeddings'
+
+_models = {}
+_stores = {}
+_registry_lock = threading.Lock()
+
+
+def get_model(model_name=DEFAULT_MODEL):
+    """Return a process-wide SentenceTransformer, loading each model only once"""
+    model = _models.get(model_name)
+    if model is None:
+        with _registry_lock:
+            model = _models.get(model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = _models[model_name] = SentenceTransformer(model_name)
+    return model
+
+
+def hub_revision(model_name=DEFAULT_MODEL):
+    """Hub commit of a sentence-transformers model; bare names live under the sentence-transformers org"""
+    return model_revision(model_name if '/' in model_name else f"sentence-transformers/{model_name}")
+
+
+def text_key(text):
+    """Content hash identifying a text in the embedding store"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Content-addressed embedding cache for one model revision, shared between processes.
+
+    Vectors live in an append-only float32 file that is memory-mapped for reads,
+    with a key file giving each text hash its row. Opening or refreshing the store
+    only reads. Writers append under an exclusive file lock and take each row from
+    the size of the vector file, so processes writing at the same time (the app and
+    main.py --embeddings) never overwrite each other's rows. A vector left without
+    a key by a crash is ignored.
+
+    meta.json records the model revision and the generation the files belong to.
+    The first write under another revision starts a new generation instead of
+    truncating files other processes may have mapped. Recently used vectors are
+    also held in an in-memory LRU.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, directory=DEFAULT_STORE_DIR, memory_items=50000, revision=None):
+        self.model_name = model_name
+        self.revision = revision
+        self.directory = os.path.join(directory, model_name.replace('/', '__'))
+        self.memory_items = memory_items
+        self._meta_path = os.path.join(self.directory, 'meta.json')
+        self._lock_path = os.path.join(self.directory, 'lock')
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._reset()
+        with self._lock:
+            self._refresh()
+
+    def _reset(self):
+        self._generation = None
+        self._rows = {}
+        self._dim = None
+        self._matrix = None
+        self._keys_read = 0
+
+    def _path(self, name, generation=None):
+        return os.path.join(self.directory, f"{name}-{generation or self._generation}")
+
+    @contextlib.contextmanager
+    def _file_lock(self, exclusive):
+        if fcntl is None or not os.path.isdir(self.directory):
+            yield
+            return
+        with open(self._lock_path, 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self, exclusive=False):
+        """Pick up rows appended since the last read, by this or another process"""
+        with self._file_lock(exclusive):
+            self._read_new_rows()
+
+    def _read_new_rows(self):
+        meta = self._read_meta()
+        if meta is None or meta.get('revision') != self.revision or 'generation' not in meta:
+            # Nothing stored yet, or vectors of another model revision
+            self._reset()
+            return
+        if meta['generation'] != self._generation:
+            self._reset()
+            self._generation = meta['generation']
+            self._dim = meta['dim']
+        vectors_path = self._path('vectors')
+        stored = os.path.getsize(vectors_path) // (4 * self._dim) if os.path.exists(vectors_path) else 0
+        try:
+            with open(self._path('keys'), 'rb') as file:
+                file.seek(self._keys_read)
+                data = file.read()
+        except FileNotFoundError:
+            data = b""
+        # A line without its newline is still being written
+        complete = data.rfind(b"\n") + 1
+        self._keys_read += complete
+        for line in data[:complete].decode('ascii').splitlines():
+            parts = line.split()
+            if len(parts) == 2 and int(parts[1]) < stored:
+                self._rows[parts[0]] = int(parts[1])
+        if stored and (self._matrix is None or len(self._matrix) != stored):
+            self._matrix = np.memmap(vectors_path, dtype=np.float32, mode='r', shape=(stored, self._dim))
+
+    def _start_generation(self, dim):
+        """New empty files for this revision; the old ones are unlinked, never truncated"""
+        old = self._read_meta()
+        generation = uuid.uuid4().hex[:12]
+        open(self._path('vectors', generation), 'wb').close()
+        open(self._path('keys', generation), 'wb').close()
+        tmp_path = self._meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'model': self.model_name, 'revision': self.revision, 'dim': dim,
+                       'generation': generation}, file)
+        os.replace(tmp_path, self._meta_path)
+        if old is not None:
+            # Stores written before generations kept a single vectors.f32 / keys.txt pair
+            generation = old.get('generation')
+            stale = [self._path(name, generation) for name in ('vectors', 'keys')] if generation else [
+                os.path.join(self.directory, name) for name in ('vectors.f32', 'keys.txt')]
+            for path in stale:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+        self._read_new_rows()
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def dim(self):
+        return self._dim
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys that are already stored"""
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            if any(key not in self._rows and key not in self._lru for key in keys):
+                self._refresh()
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                elif key in self._rows:
+                    vector = np.array(self._matrix[self._rows[key]])
+                    self._remember(key, vector)
+                else:
+                    continue
+                found[key] = vector
+        return found
+
+    def put_many(self, keys, vectors):
+        """Append new vectors (rows of a 2-D array) under their keys"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if not len(vectors):
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with self._file_lock(exclusive=True):
+                self._read_new_rows()
+                if self._generation is None or self._dim != vectors.shape[1]:
+                    self._start_generation(vectors.shape[1])
+                new = list({key: row for key, row in zip(keys, vectors) if key not in self._rows}.items())
+                if not new:
+                    return
+                # Rows start after the last complete vector; a crashed writer's partial row is dropped
+                with open(self._path('vectors'), 'r+b') as file:
+                    start = os.fstat(file.fileno()).st_size // (4 * self._dim)
+                    file.truncate(start * 4 * self._dim)
+                    file.seek(0, os.SEEK_END)
+                    file.write(b"".join(row.tobytes() for _, row in new))
+                # Vectors are written before keys so a key never points past the data
+                with open(self._path('keys'), 'ab') as file:
+                    if file.tell() and not self._ends_with_newline(file.name):
+                        file.write(b"\n")
+                    file.write("".join(f"{key} {start + i}\n" for i, (key, _) in enumerate(new)).encode('ascii'))
+                self._read_new_rows()
+            for key, row in new:
+                self._remember(key, row)
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_items:
+            self._lru.popitem(last=False)
+
+
+def get_store(model_name=DEFAULT_MODEL):
+    """Return the process-wide EmbeddingStore for a model"""
+    store = _stores.get(model_name)
+    if store is None:
+        with _registry_lock:
+            store = _stores.get(model_name)
+            if store is None:
+                store = _stores[model_name] = EmbeddingStore(model_name, revision=hub_revision(model_name))
+    return store
+
+
+def encode_texts(texts, model_name=DEFAULT_MODEL, batch_size=32):
+    """
+    Embed texts, computing each distinct text only once and reusing stored vectors
+    from earlier runs. Returns a float32 array with one row per input text.
+    """
+    texts = list(texts)
+    keys = [text_key(text) for text in texts]
+    store = get_store(model_name)
+    found = store.get_many(set(keys))
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found:
+            missing.setdefault(key, text)
+    if missing:
+        vectors = get_model(model_name).encode(
+            list(missing.values()),
+            batch_size=batch_size,
+            show_progress_bar=False
+        )
+        store.put_many(missing.keys(), vectors)
+        found.update(zip(missing.keys(), np.asarray(vectors, dtype=np.float32)))
+
+    if not texts:
+        return np.empty((0, store.dim or 0), dtype=np.float32)
+    return np.vstack([found[key] for key in keys])
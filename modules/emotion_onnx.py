@@ -0,0 +1,167 @@
+import json
+import os
+
+import numpy as np
+
+DEFAULT_ONNX_DIR = 'data/models'
+
+# Feedback is short; capping the sequence keeps int8 inference fast and memory flat
+ONNX_MAX_LENGTH = 128
+
+QUANTIZED_FILE = 'model.int8.onnx'
+LABELS_FILE = 'labels.json'
+
+
+def model_dir(model_name, directory=DEFAULT_ONNX_DIR, revision=None):
+    """Export directory of a model; each Hub revision gets its own so updated weights are re-exported"""
+    name = model_name.replace('/', '__')
+    if revision:
+        name += '@' + revision
+    return os.path.join(directory, name)
+
+
+def export_quantized(model_name, directory=DEFAULT_ONNX_DIR, opset=17, revision=None):
+    """
+    Export a HuggingFace sequence classifier (at the given Hub revision) to ONNX and
+    quantize its weights to int8 (dynamic quantization), next to its tokenizer and
+    label names. Returns the path of the quantized model.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    target = model_dir(model_name, directory, revision)
+    os.makedirs(target, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, revision=revision).eval()
+
+    sample = tokenizer(["There are huge potholes in Sector 16"], return_tensors='pt')
+    float_path = os.path.join(target, 'model.onnx')
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample['input_ids'], sample['attention_mask']),
+            float_path,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'logits': {0: 'batch'}
+            },
+            opset_version=opset,
+            dynamo=False
+        )
+
+    # Quantize to a temporary name and rename, so readers never see a partial file
+    quantized_path = os.path.join(target, QUANTIZED_FILE)
+    tmp_path = quantized_path + '.tmp'
+    quantize_dynamic(float_path, tmp_path, weight_type=QuantType.QInt8)
+    os.remove(float_path)
+    tokenizer.save_pretrained(target)
+    with open(os.path.join(target, LABELS_FILE), 'w', encoding='utf-8') as file:
+        json.dump([model.config.id2label[i] for i in range(model.config.num_labels)], file)
+    os.replace(tmp_path, quantized_path)
+    return quantized_path
+
+
+def ensure_exported(model_name, directory=DEFAULT_ONNX_DIR, revision=None):
+    """Path of the quantized model, exporting it first if needed"""
+    path = os.path.join(model_dir(model_name, directory, revision), QUANTIZED_FILE)
+    if not os.path.exists(path):
+        export_quantized(model_name, directory, revision=revision)
+    return path
+
+
+class OnnxEmotionClassifier:
+    """
+    Drop-in replacement for the transformers text-classification pipeline, running
+    the int8 ONNX export of the model with ONNX Runtime on CPU. Called with a list
+    of texts it returns one {'label', 'score'} dict per text.
+    """
+
+    def __init__(self, model_name, directory=DEFAULT_ONNX_DIR, max_length=ONNX_MAX_LENGTH, threads=None,
+                 revision=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = ensure_exported(model_name, directory, revision)
+        target = os.path.dirname(path)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.tokenizer = AutoTokenizer.from_pretrained(target)
+        with open(os.path.join(target, LABELS_FILE), 'r', encoding='utf-8') as file:
+            self.labels = json.load(file)
+        self.max_length = max_length
+
+    def __call__(self, texts, batch_size=32, truncation=True, max_length=None):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        max_length = min(max_length or self.max_length, self.max_length)
+        results = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=max_length,
+                return_tensors='np'
+            )
+            logits = self.session.run(['logits'], {
+                'input_ids': encoded['input_ids'].astype(np.int64),
+                'attention_mask': encoded['attention_mask'].astype(np.int64)
+            })[0]
+            # Softmax for the pipeline-style confidence score
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probabilities = np.exp(logits)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            best = probabilities.argmax(axis=1)
+            results.extend(
+                {'label': self.labels[i], 'score': float(row[i])}
+                for i, row in zip(best.tolist(), probabilities)
+            )
+        return results
+
+
+if __name__ == "__main__":
+    # Accuracy parity and throughput against the PyTorch pipeline:
+    # python -m modules.emotion_onnx [--input data/feedback_data.json] [--repeat 5] [--min-agreement 0.95]
+    # The PyTorch side runs exactly as analyze_batch does (max_length 512), so the
+    # agreement covers both quantization and the shorter sequence cap.
+    import argparse
+    import sys
+    import time
+
+    from modules.pipeline import iter_feedback
+    from modules.sentiment_analysis import EMOTION_MODEL
+
+    parser = argparse.ArgumentParser(description="Compare the int8 ONNX emotion backend with PyTorch")
+    parser.add_argument("--input", default="data/feedback_data.json")
+    parser.add_argument("--model", default=EMOTION_MODEL, help="Model name or local checkpoint directory")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the texts when timing")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="Fail below this label agreement")
+    args = parser.parse_args()
+
+    from transformers import pipeline
+    texts = [record["text"] for record in iter_feedback(args.input)]
+    backends = {
+        "pytorch": (pipeline("text-classification", model=args.model), 512),
+        "onnx-int8": (OnnxEmotionClassifier(args.model), ONNX_MAX_LENGTH)
+    }
+
+    labels = {}
+    for name, (classifier, max_length) in backends.items():
+        # Warm up once so one-time setup is not timed
+        classifier(texts[:args.batch_size], batch_size=args.batch_size, truncation=True, max_length=max_length)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            outputs = classifier(texts, batch_size=args.batch_size, truncation=True, max_length=max_length)
+        elapsed = time.perf_counter() - start
+        labels[name] = [output['label'] for output in outputs]
+        print(f"{name:>10}: {len(texts) * args.repeat / elapsed:8.1f} texts/s")
+
+    agreement = np.mean([a == b for a, b in zip(labels["pytorch"], labels["onnx-int8"])])
+    print(f"label agreement on {len(texts)} texts: {agreement:.3f} (minimum {args.min_agreement})")
+    sys.exit(0 if agreement >= args.min_agreement else 1)
@@ -0,0 +1,137 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+FILTER_DIMENSIONS = ('sentiment', 'category', 'emotion')
+
+
+def _codes(series):
+    """Integer codes (-1 for missing) and their labels for a label column"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), [str(label) for label in series.cat.categories]
+    codes, labels = pd.factorize(series.astype(object), sort=True)
+    return codes, [str(label) for label in labels]
+
+
+class FilterSelection:
+    """Positions of the rows passing one set of filters, plus a stable key for caches"""
+
+    def __init__(self, positions, signature):
+        self.positions = positions
+        self.signature = signature
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class FilterEngine:
+    """
+    Sidebar filters over integer keys computed once per dataset.
+
+    Each row gets a day code (index into the sorted distinct days) and a code per
+    label column. A filter then builds a small boolean lookup table over days or
+    labels and gathers it by code, so a filter change costs a few vectorized passes
+    over small integer arrays instead of per-row dates and string comparisons.
+    Selections are memoized per filter tuple.
+    """
+
+    def __init__(self, df, dimensions=FILTER_DIMENSIONS, memo_size=64):
+        day_codes, days = pd.factorize(df['timestamp'].dt.floor('D'), sort=True)
+        self.day_codes = day_codes.astype(np.int32)
+        self.days = days.to_numpy(dtype='datetime64[D]')
+        self.codes = {}
+        self.labels = {}
+        for dimension in dimensions:
+            if dimension in df:
+                codes, labels = _codes(df[dimension])
+                self.codes[dimension] = codes.astype(np.int16)
+                self.labels[dimension] = labels
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.day_codes)
+
+    @staticmethod
+    def _gather(lookup, codes):
+        # A trailing False makes code -1 (missing value) never match
+        return np.append(lookup, False)[codes]
+
+    def mask(self, start=None, end=None, **selected):
+        """Boolean row mask for an inclusive date range and allowed labels per dimension"""
+        allowed_days = np.ones(len(self.days), dtype=bool)
+        if start is not None:
+            allowed_days &= self.days >= np.datetime64(start, 'D')
+        if end is not None:
+            allowed_days &= self.days <= np.datetime64(end, 'D')
+        mask = self._gather(allowed_days, self.day_codes)
+        for dimension, allowed in selected.items():
+            if allowed is None:
+                continue
+            allowed = {str(value) for value in allowed}
+            lookup = np.fromiter((label in allowed for label in self.labels[dimension]), dtype=bool,
+                                 count=len(self.labels[dimension]))
+            mask &= self._gather(lookup, self.codes[dimension])
+        return mask
+
+    def select(self, start=None, end=None, **selected):
+        """Memoized FilterSelection for the same arguments as mask()"""
+        key = (
+            None if start is None else str(start),
+            None if end is None else str(end),
+            tuple(sorted(
+                (dimension, None if allowed is None else tuple(sorted({str(value) for value in allowed})))
+                for dimension, allowed in selected.items()
+            ))
+        )
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        positions = np.flatnonzero(self.mask(start, end, **selected))
+        selection = FilterSelection(positions, hashlib.sha1(repr(key).encode()).hexdigest())
+        with self._lock:
+            self._memo[key] = selection
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return selection
+
+
+if __name__ == "__main__":
+    # Filter latency against per-row date and isin masks: python -m modules.filters [rows]
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    categories = ['Health', 'Education', 'Infrastructure', 'Environment', 'Public Safety']
+    frame = pd.DataFrame({
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, n), unit='s'),
+        'category': pd.Categorical(rng.choice(categories, n)),
+        'sentiment': pd.Categorical(rng.choice(['Positive', 'Neutral', 'Negative'], n)),
+        'emotion': pd.Categorical(rng.choice(['joy', 'anger', 'fear', 'sadness', 'neutral'], n))
+    })
+    start = time.perf_counter()
+    engine = FilterEngine(frame)
+    print(f"keys for {n} rows built in {time.perf_counter() - start:.2f} s")
+
+    first, last = pd.Timestamp('2024-03-01').date(), pd.Timestamp('2024-09-30').date()
+    sentiments, chosen = ['Positive', 'Negative'], categories[:3]
+    start = time.perf_counter()
+    selection = engine.select(first, last, sentiment=sentiments, category=chosen)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    engine.select(first, last, sentiment=sentiments, category=chosen)
+    warm = time.perf_counter() - start
+    start = time.perf_counter()
+    mask = (
+        frame['sentiment'].isin(sentiments) & frame['category'].isin(chosen)
+        & (frame['timestamp'].dt.date >= first) & (frame['timestamp'].dt.date <= last)
+    )
+    scanned = time.perf_counter() - start
+    assert np.array_equal(selection.positions, np.flatnonzero(mask.to_numpy()))
+    print(f"filter: engine {cold * 1000:.1f} ms, memoized {warm * 1000:.3f} ms, pandas masks {scanned * 1000:.0f} ms")
@@ -0,0 +1,326 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_CACHE_PATH = 'data/geocode_cache.sqlite'
+DEFAULT_GAZETTEER_PATH = 'data/gazetteer.json'
+
+# Successful lookups rarely change; misses are retried sooner in case the provider learns the place
+DEFAULT_TTL = 90 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 7 * 24 * 3600
+
+# Nominatim usage policy: an absolute maximum of one request per second
+NOMINATIM_RATE = 1.0
+
+
+def transient_errors():
+    """Provider errors worth retrying: rate limiting, timeouts and an unreachable service"""
+    from geopy.exc import GeocoderRateLimited, GeocoderTimedOut, GeocoderUnavailable
+    return GeocoderRateLimited, GeocoderTimedOut, GeocoderUnavailable, ConnectionError, TimeoutError
+
+
+def normalize_location(location_name):
+    """Canonical cache key for a location string ("  Sector 16,Chandigarh" -> "sector 16, chandigarh")"""
+    if not location_name:
+        return ""
+    parts = [" ".join(part.split()) for part in str(location_name).lower().split(",")]
+    return ", ".join(part for part in parts if part)
+
+
+class GeocodeCache:
+    """Persistent SQLite cache of geocoding results, including misses"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " query TEXT PRIMARY KEY,"
+            " latitude REAL,"
+            " longitude REAL,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, queries):
+        """Return {query: (lat, lon)} for fresh entries; misses are cached as (None, None)"""
+        now = time.time()
+        found = {}
+        queries = list(queries)
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(queries), 500):
+            chunk = queries[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT query, latitude, longitude, fetched_at FROM geocode WHERE query IN ({placeholders})",
+                    chunk
+                ).fetchall()
+            for query, lat, lon, fetched_at in rows:
+                ttl = self.ttl if lat is not None else self.negative_ttl
+                if now - fetched_at <= ttl:
+                    found[query] = (lat, lon)
+        return found
+
+    def put_many(self, items):
+        """Store an iterable of (query, lat, lon) rows"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO geocode (query, latitude, longitude, fetched_at) VALUES (?, ?, ?, ?)",
+                [(query, lat, lon, now) for query, lat, lon in items]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Gazetteer:
+    """Offline lookup table of known places loaded from a bundled JSON file"""
+
+    def __init__(self, path=DEFAULT_GAZETTEER_PATH):
+        self._index = {}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)
+            for entry in entries:
+                coords = (entry['latitude'], entry['longitude'])
+                for name in [entry['name']] + entry.get('aliases', []):
+                    self._index.setdefault(normalize_location(name), coords)
+
+    def __len__(self):
+        return len(self._index)
+
+    def lookup(self, location_name):
+        """Resolve the most specific known place, dropping leading parts ("Sector 16, Chandigarh" -> "Chandigarh")"""
+        parts = normalize_location(location_name).split(", ")
+        for start in range(len(parts)):
+            key = ", ".join(parts[start:])
+            if key in self._index:
+                return self._index[key]
+        # Fall back to any single component, e.g. the city in "Sector 4, Pune, MH"
+        for part in parts:
+            if part in self._index:
+                return self._index[part]
+        return None, None
+
+
+class Geocoder:
+    """
+    Resolves location names through the persistent cache first, then Nominatim,
+    and finally the bundled gazetteer when the network is unavailable.
+
+    Transient provider errors are retried with exponential backoff and jitter; the
+    geocoder only goes offline after max_failures lookups in a row fail that way.
+    """
+
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, gazetteer_path=DEFAULT_GAZETTEER_PATH,
+                 ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, offline=False,
+                 user_agent="feedback-analyzer", timeout=10, max_retries=3, backoff=1.0,
+                 max_failures=3):
+        self.cache = GeocodeCache(cache_path, ttl=ttl, negative_ttl=negative_ttl)
+        self.gazetteer = Gazetteer(gazetteer_path)
+        self.offline = offline
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_failures = max_failures
+        self.remote_calls = 0
+        self._failures = 0
+        self._counter_lock = threading.Lock()
+        self._geolocator = None
+
+    def _geocode_remote(self, location_name):
+        if self._geolocator is None:
+            from geopy.geocoders import Nominatim
+            self._geolocator = Nominatim(user_agent=self.user_agent)
+        with self._counter_lock:
+            self.remote_calls += 1
+        location = self._geolocator.geocode(location_name, timeout=self.timeout)
+        if location:
+            return location.latitude, location.longitude
+        return None, None
+
+    def _fetch_remote(self, key, throttle=None):
+        """Remote lookup of key, retrying transient errors; throttle is called before every attempt"""
+        errors = transient_errors()
+        for attempt in range(self.max_retries + 1):
+            if throttle is not None:
+                throttle()
+            try:
+                return self._geocode_remote(key)
+            except errors as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * (1 + random.random())
+                delay = max(delay, getattr(e, 'retry_after', None) or 0)
+                print(f"Retrying {key} in {delay:.1f}s after error: {e}")
+                time.sleep(delay)
+
+    def lookup_remote(self, key, throttle=None):
+        """(lat, lon) from the provider, or None when the lookup failed and should not be cached"""
+        try:
+            result = self._fetch_remote(key, throttle)
+        except transient_errors() as e:
+            with self._counter_lock:
+                self._failures += 1
+                if self._failures >= self.max_failures and not self.offline:
+                    print(f"Error geocoding {key}: {e}; switching to offline gazetteer")
+                    self.offline = True
+                    return None
+            print(f"Error geocoding {key}: {e}")
+            return None
+        except Exception as e:
+            # A bad answer for this name says nothing about the provider being reachable
+            print(f"Error geocoding {key}: {e}")
+            return None
+        with self._counter_lock:
+            self._failures = 0
+        return result
+
+    def geocode_many(self, location_names):
+        """Geocode a batch of names, looking up each distinct location only once"""
+        keys = {}
+        for name in location_names:
+            keys.setdefault(name, normalize_location(name))
+
+        unique_keys = {key for key in keys.values() if key}
+        resolved = self.cache.get_many(unique_keys)
+
+        fetched = []
+        for key in sorted(unique_keys - resolved.keys()):
+            if self.offline:
+                # Provider unreachable: answer the rest of the batch from the gazetteer
+                break
+            result = self.lookup_remote(key)
+            if result is not None:
+                resolved[key] = result
+                fetched.append((key,) + result)
+        if fetched:
+            self.cache.put_many(fetched)
+
+        results = {}
+        for name, key in keys.items():
+            lat, lon = resolved.get(key, (None, None))
+            if lat is None and key:
+                lat, lon = self.gazetteer.lookup(key)
+            results[name] = (lat, lon)
+        return results
+
+    def geocode(self, location_name):
+        return self.geocode_many([location_name])[location_name]
+
+    def prefetch(self, location_names):
+        """No-op: the synchronous geocoder resolves names when geocode_many is called"""
+
+    def close(self):
+        self.cache.close()
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConcurrentGeocoder:
+    """
+    Runs a Geocoder's lookups on a background thread pool so geocoding overlaps
+    model inference.
+
+    Remote calls (including the wrapped geocoder's retries) share one token bucket
+    so the provider's rate limit holds across workers, and concurrent requests for
+    the same location share a single future.
+    """
+
+    def __init__(self, geocoder, rate=NOMINATIM_RATE, burst=1, max_workers=2):
+        self.geocoder = geocoder
+        self.bucket = TokenBucket(rate, burst)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geocoder")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    @property
+    def remote_calls(self):
+        return self.geocoder.remote_calls
+
+    def _resolve(self, key):
+        cached = self.geocoder.cache.get_many([key])
+        if key in cached:
+            lat, lon = cached[key]
+        elif self.geocoder.offline:
+            lat, lon = None, None
+        else:
+            result = self.geocoder.lookup_remote(key, throttle=self.bucket.acquire)
+            if result is None:
+                lat, lon = None, None
+            else:
+                lat, lon = result
+                self.geocoder.cache.put_many([(key, lat, lon)])
+        if lat is None:
+            lat, lon = self.geocoder.gazetteer.lookup(key)
+        return lat, lon
+
+    def submit(self, location_name):
+        """Return a Future resolving to (lat, lon), reusing any in-flight or finished lookup"""
+        key = normalize_location(location_name)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                if key:
+                    future = self._executor.submit(self._resolve, key)
+                else:
+                    future = Future()
+                    future.set_result((None, None))
+                self._futures[key] = future
+        return future
+
+    def prefetch(self, location_names):
+        """Start resolving names in the background without waiting"""
+        for name in location_names:
+            self.submit(name)
+
+    def geocode_many(self, location_names):
+        futures = {}
+        for name in location_names:
+            if name not in futures:
+                futures[name] = self.submit(name)
+        return {name: future.result() for name, future in futures.items()}
+
+    def geocode(self, location_name):
+        return self.submit(location_name).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.geocoder.close()
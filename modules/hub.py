@@ -0,0 +1,13 @@
+import functools
+import os
+
+
+@functools.lru_cache(maxsize=None)
+def model_revision(repo_id, filename="config.json"):
+    """
+    Hub commit a model repository resolves to, looked up once per process. Only
+    filename is fetched (or read from the local cache when offline), and cached
+    files live under .../snapshots/<commit>/.
+    """
+    from huggingface_hub import hf_hub_download
+    return os.path.basename(os.path.dirname(hf_hub_download(repo_id, filename)))
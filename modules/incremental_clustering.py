@@ -0,0 +1,282 @@
+import numpy as np
+from sklearn.neighbors import BallTree
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from modules.spatial_index import EARTH_RADIUS_KM
+
+# Offsets of a grid cell and its 26 neighbours
+_NEIGHBOUR_CELLS = [(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)]
+
+
+def _unit_vectors(lat, lon):
+    """Degrees to points on the unit sphere; chord length is monotonic in great-circle distance"""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+class IncrementalSpatialClusterer:
+    """
+    Haversine DBSCAN over a growing set of points, updated in place as points arrive.
+
+    The first fit() runs a bulk BallTree radius query. After that, insert() only
+    looks at the grid cells around the new points: neighbour counts are bumped,
+    points that become core are unioned with their core neighbours and nearby
+    unassigned points become border points. Points are never removed, so clusters
+    can only grow or merge, and the result matches a full DBSCAN recompute (core
+    points and noise exactly; a border point reachable from two clusters may be
+    given either one, as in DBSCAN itself).
+
+    Cluster ids are stable across updates: a cluster keeps its id as it grows and
+    a merge keeps the older (smaller) id.
+    """
+
+    def __init__(self, max_radius_km=5, min_samples=3):
+        self.max_radius_km = max_radius_km
+        self.min_samples = min_samples
+        self.eps = max_radius_km / EARTH_RADIUS_KM
+        # Chord length on the unit sphere for an arc of eps radians
+        self._chord = 2.0 * np.sin(self.eps / 2.0)
+        self._xyz = np.empty((0, 3))
+        self._grid = {}
+        self._counts = []
+        self._core = []
+        self._parent = []
+        self._border = []
+        self._ids = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._counts)
+
+    # Spatial grid over unit vectors, one cell per chord length
+
+    def _cell(self, xyz):
+        return tuple(np.floor(xyz / self._chord).astype(np.int64).tolist())
+
+    def _index(self, start):
+        cells = np.floor(self._xyz[start:] / self._chord).astype(np.int64)
+        for offset, cell in enumerate(map(tuple, cells.tolist())):
+            self._grid.setdefault(cell, []).append(start + offset)
+
+    def neighbours(self, i):
+        """Indices of all points within max_radius_km of point i, including itself"""
+        x, y, z = self._cell(self._xyz[i])
+        candidates = []
+        for dx, dy, dz in _NEIGHBOUR_CELLS:
+            candidates.extend(self._grid.get((x + dx, y + dy, z + dz), ()))
+        candidates = np.asarray(candidates, dtype=np.int64)
+        distances = np.sum((self._xyz[candidates] - self._xyz[i]) ** 2, axis=1)
+        return candidates[distances <= self._chord ** 2]
+
+    # Union-find over core points
+
+    def _find(self, i):
+        root = i
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[i] != root:
+            self._parent[i], i = root, self._parent[i]
+        return root
+
+    def _union(self, a, b, merged):
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        id_a, id_b = self._ids.get(a), self._ids.get(b)
+        # The surviving root carries the older id; fresh components have none yet
+        if id_a is None or (id_b is not None and id_b < id_a):
+            a, b, id_a, id_b = b, a, id_b, id_a
+        self._parent[b] = a
+        self._ids.pop(b, None)
+        if id_b is not None:
+            merged[id_b] = id_a
+
+    def fit(self, lat, lon):
+        """Cluster an initial set of points in bulk, replacing any existing state"""
+        self.__init__(self.max_radius_km, self.min_samples)
+        self._xyz = _unit_vectors(lat, lon)
+        n = len(self._xyz)
+        if n == 0:
+            return self
+        self._index(0)
+
+        coords = np.radians(np.column_stack([lat, lon]).astype(float))
+        neighbourhoods = BallTree(coords, metric='haversine').query_radius(coords, self.eps)
+        counts = np.fromiter((len(hood) for hood in neighbourhoods), dtype=np.int64, count=n)
+        core = counts >= self.min_samples
+
+        # Connected components of the core-core neighbour graph are the clusters
+        rows = np.repeat(np.arange(n), counts)
+        cols = np.concatenate(neighbourhoods)
+        keep = core[rows] & core[cols]
+        graph = coo_matrix((np.ones(keep.sum(), dtype=np.int8), (rows[keep], cols[keep])), shape=(n, n))
+        _, components = connected_components(graph, directed=False)
+
+        # Each component's first point is its root; ids follow order of first appearance
+        parent = np.arange(n)
+        core_index = np.flatnonzero(core)
+        roots = {}
+        for i, component in zip(core_index.tolist(), components[core_index].tolist()):
+            root = roots.setdefault(component, i)
+            parent[i] = root
+            if root == i:
+                self._ids[i] = self._next_id
+                self._next_id += 1
+
+        border = np.full(n, -1, dtype=np.int64)
+        for i in np.flatnonzero(~core & (counts > 1)).tolist():
+            hood = neighbourhoods[i]
+            core_neighbours = hood[core[hood]]
+            if len(core_neighbours):
+                border[i] = core_neighbours.min()
+
+        self._counts = counts.tolist()
+        self._core = core.tolist()
+        self._parent = parent.tolist()
+        self._border = border.tolist()
+        return self
+
+    def insert(self, lat, lon):
+        """
+        Add points and update clusters around them only.
+
+        Returns (changed, merged): the ids of clusters that gained points or were
+        created, and {absorbed id: surviving id} for clusters merged by the update.
+        """
+        start = len(self)
+        xyz = _unit_vectors(lat, lon)
+        added = len(xyz)
+        if added == 0:
+            return set(), {}
+        self._xyz = np.vstack([self._xyz, xyz])
+        self._counts.extend([0] * added)
+        self._core.extend([False] * added)
+        self._parent.extend(range(start, start + added))
+        self._border.extend([-1] * added)
+        self._index(start)
+
+        # 1. Neighbour counts: new points count everything, old points count new neighbours
+        hoods = {}
+        for i in range(start, start + added):
+            hood = hoods[i] = self.neighbours(i)
+            self._counts[i] = len(hood)
+            for j in hood[hood < start].tolist():
+                self._counts[j] += 1
+        touched = {j for hood in hoods.values() for j in hood.tolist()}
+
+        # 2. Points that just became core
+        promoted = [i for i in sorted(touched) if not self._core[i] and self._counts[i] >= self.min_samples]
+        for i in promoted:
+            self._core[i] = True
+            self._border[i] = -1
+
+        # 3. Link promoted points to core neighbours and claim unassigned neighbours as border
+        merged = {}
+        for i in promoted:
+            hood = hoods[i] if i in hoods else self.neighbours(i)
+            for j in hood.tolist():
+                if self._core[j]:
+                    self._union(i, j, merged)
+                elif self._border[j] == -1:
+                    self._border[j] = i
+        for i in promoted:
+            root = self._find(i)
+            if root not in self._ids:
+                self._ids[root] = self._next_id
+                self._next_id += 1
+
+        # 4. New points that are not core join a cluster through any core neighbour
+        for i, hood in hoods.items():
+            if not self._core[i] and self._border[i] == -1:
+                core_neighbours = [j for j in hood.tolist() if self._core[j]]
+                if core_neighbours:
+                    self._border[i] = min(core_neighbours)
+
+        changed = {self._label(i) for i in list(promoted) + list(hoods)}
+        changed.discard(-1)
+        # Chains of merges resolve to the id that finally survived
+        for absorbed, survivor in merged.items():
+            while survivor in merged:
+                survivor = merged[survivor]
+            merged[absorbed] = survivor
+        return changed, merged
+
+    def _label(self, i):
+        if self._core[i]:
+            return self._ids[self._find(i)]
+        if self._border[i] != -1:
+            return self._ids[self._find(self._border[i])]
+        return -1
+
+    def labels(self):
+        """Cluster id per point in insertion order, -1 for noise"""
+        return np.fromiter((self._label(i) for i in range(len(self))), dtype=np.int64, count=len(self))
+
+
+def _same_clustering(labels, reference, core):
+    """Whether two labelings agree up to renaming on core points and on noise"""
+    if not np.array_equal(labels == -1, reference == -1):
+        return False
+    pairs = set(zip(labels[core].tolist(), reference[core].tolist()))
+    return len(pairs) == len({a for a, _ in pairs}) == len({b for _, b in pairs})
+
+
+def _synthetic_points(n, seed=0, centers=300):
+    rng = np.random.default_rng(seed)
+    middle = np.column_stack([rng.uniform(8, 34, centers), rng.uniform(68, 92, centers)])
+    which = rng.integers(0, centers, n)
+    points = middle[which] + rng.normal(0, 0.05, (n, 2))
+    # A share of scattered reports that mostly end up as noise
+    scattered = rng.random(n) < 0.2
+    points[scattered] = np.column_stack([rng.uniform(8, 34, scattered.sum()), rng.uniform(68, 92, scattered.sum())])
+    return points[:, 0], points[:, 1]
+
+
+if __name__ == "__main__":
+    # Parity check and streaming benchmark: python -m modules.incremental_clustering
+    import time
+    from sklearn.cluster import DBSCAN
+
+    def full_dbscan(lat, lon, radius_km=5, min_samples=3):
+        coords = np.radians(np.column_stack([lat, lon]))
+        model = DBSCAN(eps=radius_km / EARTH_RADIUS_KM, min_samples=min_samples, metric='haversine', algorithm='ball_tree')
+        labels = model.fit_predict(coords)
+        core = np.zeros(len(lat), dtype=bool)
+        core[model.core_sample_indices_] = True
+        return labels, core
+
+    # Parity: fit on part of the data, stream the rest in small batches, compare with a full recompute
+    lat, lon = _synthetic_points(20_000, seed=1)
+    clusterer = IncrementalSpatialClusterer().fit(lat[:10_000], lon[:10_000])
+    previous = clusterer.labels()
+    stable = True
+    for start in range(10_000, 20_000, 500):
+        changed, merged = clusterer.insert(lat[start:start + 500], lon[start:start + 500])
+        labels = clusterer.labels()
+        # Existing clustered points keep their id unless their cluster was merged into another
+        old = previous != -1
+        expected = np.array([merged.get(label, label) for label in previous[old].tolist()])
+        stable &= np.array_equal(labels[:len(previous)][old], expected)
+        previous = labels
+    reference, core = full_dbscan(lat, lon)
+    print(f"parity with full DBSCAN: {_same_clustering(previous, reference, core)}, stable ids: {stable}")
+
+    # Benchmark: 100k points already clustered, then batches of 10 new reports
+    lat, lon = _synthetic_points(100_100, seed=2)
+    base = 100_000
+    start = time.perf_counter()
+    clusterer = IncrementalSpatialClusterer().fit(lat[:base], lon[:base])
+    print(f"initial fit, {base} points: {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    for offset in range(base, len(lat), 10):
+        clusterer.insert(lat[offset:offset + 10], lon[offset:offset + 10])
+    incremental = (time.perf_counter() - start) / 10
+    start = time.perf_counter()
+    for offset in range(base + 10, len(lat) + 1, 50):
+        full_dbscan(lat[:offset], lon[:offset])
+    full = (time.perf_counter() - start) / 2
+    print(f"per 10-point insert: incremental {incremental * 1000:.1f} ms, full DBSCAN {full * 1000:.0f} ms "
+          f"({full / incremental:.0f}x)")
@@ -0,0 +1,208 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def result_size(result):
+    """Approximate bytes held by a job result: DataFrames and arrays are measured, anything else counts as 0"""
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    return int(getattr(result, 'nbytes', 0))
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback once the job has been cancelled"""
+
+
+class Job:
+    """
+    One background computation. status (queued, running, done, failed or cancelled),
+    progress, message, result and error are plain attributes updated by the worker
+    thread and safe to read from any session. subscribers holds the sessions waiting
+    for the result.
+    """
+
+    def __init__(self, job_id, key):
+        self.id = job_id
+        self.key = key
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = "Waiting for a worker"
+        self.result = None
+        self.result_bytes = 0
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self.subscribers = set()
+        self._cancelled = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def report(self, fraction, message=None):
+        """Progress callback handed to the job function; raises JobCancelled after cancel()"""
+        if self._cancelled.is_set():
+            raise JobCancelled(self.id)
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message:
+            self.message = message
+
+
+class JobManager:
+    """
+    Runs keyed computations on a thread pool.
+
+    Submitting a key that already has a queued, running or finished job returns that
+    job instead of starting another, so sessions asking for the same result share
+    one computation and finished results are reused. Failed and cancelled jobs are
+    replaced on the next submit. At most max_results finished jobs, holding at most
+    max_result_bytes of results together, are kept, least recently requested dropped
+    first; the most recently requested result is always kept.
+
+    Each submitting session is counted as a subscriber of the job; cancelling on
+    behalf of a subscriber only stops the job once no other subscriber is left.
+    """
+
+    def __init__(self, max_workers=2, max_results=32, max_result_bytes=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._by_key = OrderedDict()
+        self._max_results = max_results
+        self._max_result_bytes = max_result_bytes
+        self._lock = threading.Lock()
+
+    def submit(self, key, func, *args, subscriber=None, **kwargs):
+        """
+        Job for key, running func(*args, progress=job.report, **kwargs) unless one already
+        exists; subscriber, if given, is added to the job's subscribers.
+        """
+        with self._lock:
+            job = self._by_key.get(key)
+            if job is not None and job.status not in ('failed', 'cancelled'):
+                self._by_key.move_to_end(key)
+                if subscriber is not None:
+                    job.subscribers.add(subscriber)
+                return job
+            if job is not None:
+                # The failed or cancelled job is replaced for good
+                del self._jobs[job.id]
+            job = Job(uuid.uuid4().hex[:12], key)
+            if subscriber is not None:
+                job.subscribers.add(subscriber)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._by_key.move_to_end(key)
+            self._evict()
+            job.future = self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job._cancelled.is_set():
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+            return
+        job.status = 'running'
+        job.message = "Running"
+        try:
+            job.result = func(*args, progress=job.report, **kwargs)
+            job.result_bytes = result_size(job.result)
+            job.progress = 1.0
+            job.message = "Done"
+            job.status = 'done'
+        except JobCancelled:
+            job.message = "Cancelled"
+            job.status = 'cancelled'
+        except Exception as error:
+            job.error = error
+            job.message = f"Failed: {error}"
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._evict()
+
+    def _evict(self):
+        finished = [key for key, job in self._by_key.items() if job.finished]
+        excess = len(finished) - self._max_results
+        total = sum(self._by_key[key].result_bytes for key in finished)
+        for key in finished[:-1]:
+            if excess <= 0 and (self._max_result_bytes is None or total <= self._max_result_bytes):
+                break
+            job = self._by_key.pop(key)
+            del self._jobs[job.id]
+            excess -= 1
+            total -= job.result_bytes
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def lookup(self, key):
+        """Latest job for key, or None if it was never submitted (or was evicted)"""
+        with self._lock:
+            return self._by_key.get(key)
+
+    def cancel(self, job_id, subscriber=None):
+        """
+        Ask a job to stop. With a subscriber, only that subscriber is removed and the
+        job keeps running while others remain. Queued jobs never start; running jobs
+        stop at their next progress report. Returns whether the job is being cancelled.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            if subscriber is not None:
+                job.subscribers.discard(subscriber)
+                if job.subscribers:
+                    return False
+            job._cancelled.set()
+        if job.future is not None and job.future.cancel():
+            job.message = "Cancelled"
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+        return True
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    # Sharing, cancellation and caching on a toy job: python -m modules.jobs
+    calls = []
+
+    def slow_square(x, progress, steps=20):
+        calls.append(x)
+        for step in range(steps):
+            progress(step / steps, f"step {step}")
+            time.sleep(0.01)
+        return x * x
+
+    manager = JobManager(max_workers=2)
+    first = manager.submit(('square', 3), slow_square, 3, subscriber='a')
+    second = manager.submit(('square', 3), slow_square, 3, subscriber='b')
+    assert first is second, "same key must share one job"
+    assert not manager.cancel(first.id, subscriber='a'), "another subscriber is still waiting"
+    other = manager.submit(('square', 4), slow_square, 4, subscriber='a')
+    assert manager.cancel(other.id, subscriber='a')
+    wait([first.future, other.future])
+    assert first.status == 'done' and first.result == 9
+    assert other.status == 'cancelled'
+    assert manager.submit(('square', 3), slow_square, 3) is first, "finished results are reused"
+    assert calls.count(3) == 1
+    retried = manager.submit(('square', 4), slow_square, 4)
+    assert manager.get(other.id) is None, "replaced jobs are dropped"
+    wait([retried.future])
+
+    # Results past the byte budget are dropped, least recently requested first
+    import numpy as np
+    bounded = JobManager(max_workers=1, max_result_bytes=3 * 8000)
+    made = [bounded.submit(('zeros', i), lambda i, progress: np.zeros(1000), i) for i in range(5)]
+    wait([job.future for job in made])
+    kept = [job for job in made if bounded.get(job.id) is not None]
+    assert kept == made[-3:], [job.key for job in kept]
+    print(f"ok: 3 submits of one key ran it once, cancelled job ended {other.status!r}, retry {retried.status!r}")
+    manager.shutdown()
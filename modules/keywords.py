@@ -0,0 +1,130 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Lowercased words, keeping inner apostrophes ("don't") and dropping punctuation
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+# Words too common in feedback to describe an issue
+DEFAULT_STOPWORDS = frozenset({'in', 'the', 'is', 'are', 'on', 'for', 'a', 'of', 'to', 'and', 'its', 'it'})
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+class KeywordIndex:
+    """
+    Sparse document-term count matrix over a fixed list of texts.
+
+    Every text is tokenized once, when the index is built. Term counts for any
+    subset of rows are then one sparse matrix-vector product, and top-k results
+    are memoized per (row subset, query) so repeated reruns with the same filters
+    cost a dictionary lookup.
+    """
+
+    def __init__(self, texts, memo_size=256):
+        vocabulary = {}
+        indptr = [0]
+        indices = []
+        for text in texts:
+            for token in tokenize(text):
+                indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.int32)
+        # Repeated (row, term) entries are summed into counts
+        self.matrix = csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(vocabulary)))
+        self.matrix.sum_duplicates()
+        self.terms = np.array(list(vocabulary), dtype=object)
+        self.term_lengths = np.fromiter((len(term) for term in self.terms), dtype=np.int64, count=len(self.terms))
+        self._transposed = self.matrix.T.tocsr()
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def signature(rows):
+        """Stable key for a row subset (None means every row)"""
+        if rows is None:
+            return None
+        return hashlib.sha1(np.ascontiguousarray(rows, dtype=np.int64).tobytes()).hexdigest()
+
+    def counts(self, rows=None):
+        """Total count of every term over the given rows (positions), or over all rows"""
+        selector = np.ones(len(self), dtype=np.int32)
+        if rows is not None:
+            selector = np.zeros(len(self), dtype=np.int32)
+            selector[np.asarray(rows, dtype=np.int64)] = 1
+        return self._transposed @ selector
+
+    def _memoized(self, key, compute):
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        value = compute()
+        with self._lock:
+            self._memo[key] = value
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return value
+
+    def top_terms(self, rows=None, k=10, min_length=4, stopwords=DEFAULT_STOPWORDS, signature=None):
+        """
+        The k most frequent terms over the rows as [(term, count)], most frequent first.
+        Terms shorter than min_length or in stopwords are skipped. signature, if given,
+        identifies the row subset in the memo instead of hashing the rows.
+        """
+        signature = signature if signature is not None else self.signature(rows)
+        key = ('top', signature, k, min_length, frozenset(stopwords or ()))
+
+        def compute():
+            counts = self.counts(rows)
+            keep = (counts > 0) & (self.term_lengths >= min_length)
+            if stopwords:
+                keep &= ~np.isin(self.terms, list(stopwords))
+            candidates = np.flatnonzero(keep)
+            # Highest counts first; ties keep first-seen order like Counter.most_common
+            order = np.lexsort((candidates, -counts[candidates]))[:k]
+            return [(self.terms[i], int(counts[i])) for i in candidates[order]]
+
+        return self._memoized(key, compute)
+
+    def frequencies(self, rows=None, max_words=200, min_length=1, stopwords=DEFAULT_STOPWORDS, signature=None):
+        """{term: count} for the max_words most frequent terms, e.g. for WordCloud.generate_from_frequencies"""
+        return dict(self.top_terms(rows, k=max_words, min_length=min_length, stopwords=stopwords, signature=signature))
+
+
+if __name__ == "__main__":
+    # Index build and memoized query timings: python -m modules.keywords [rows]
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(0)
+    words = np.array([f"word{i}" for i in range(5000)] + ['pothole', 'garbage', 'water', 'hospital', 'school'])
+    texts = [" ".join(rng.choice(words, 12)) for _ in range(n)]
+
+    start = time.perf_counter()
+    index = KeywordIndex(texts)
+    print(f"{n} texts, {len(index.terms)} terms, indexed in {time.perf_counter() - start:.2f} s")
+
+    rows = np.flatnonzero(rng.random(n) < 0.3)
+    start = time.perf_counter()
+    index.top_terms(rows, k=5)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    index.top_terms(rows, k=5)
+    warm = time.perf_counter() - start
+    start = time.perf_counter()
+    from collections import Counter
+    Counter(w.lower() for w in " ".join(texts[i] for i in rows).split() if len(w) > 3).most_common(5)
+    baseline = time.perf_counter() - start
+    print(f"top-5 over {len(rows)} rows: {cold * 1000:.1f} ms, memoized {warm * 1000:.3f} ms, re-tokenizing {baseline * 1000:.0f} ms")
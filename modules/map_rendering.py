@@ -0,0 +1,257 @@
+import json
+
+import numpy as np
+import pandas as pd
+from folium import Map
+from folium.map import Layer
+from folium.plugins import FastMarkerCluster, HeatMap
+from folium.utilities import get_obj_in_upper_tree
+from jinja2 import Template
+
+from modules.spatial_binning import pyramid_payload
+
+CATEGORY_COLORS = {
+    "Health": "green",
+    "Education": "blue",
+    "Infrastructure": "orange",
+    "Environment": "purple",
+    "Public Safety": "red"
+}
+
+# ~1 m precision is plenty for display and keeps the HTML small
+COORDINATE_DECIMALS = 5
+
+
+def _js_literal(value):
+    """JSON that is safe to inline inside a <script> block"""
+    return json.dumps(value, ensure_ascii=False).replace("</", "<\\/")
+
+
+def _codes(series):
+    """Dictionary-encode a column into (integer codes, list of labels)"""
+    categorical = pd.Categorical(series.astype(str))
+    return categorical.codes.tolist(), [str(label) for label in categorical.categories]
+
+
+def _located(df):
+    return df.dropna(subset=['latitude', 'longitude'])
+
+
+class LazyPopupMarkerCluster(FastMarkerCluster):
+    """
+    Clustered markers for a whole DataFrame, rendered in the browser.
+
+    Rows are shipped as compact [lat, lon, category, sentiment, row] arrays with
+    dictionary-encoded labels; marker icons and popup HTML are only built in
+    JavaScript, and popups only when a marker is clicked.
+    """
+
+    _callback = Template("""(function () {
+        var categories = {{ categories }};
+        var sentiments = {{ sentiments }};
+        var colors = {{ colors }};
+        var texts = {{ texts }};
+        function escapeHtml(value) {
+            return String(value).replace(/[&<>"']/g, function (c) {
+                return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+            });
+        }
+        return function (row) {
+            var category = categories[row[2]];
+            var marker = L.marker(new L.LatLng(row[0], row[1]), {
+                icon: L.AwesomeMarkers.icon({
+                    icon: 'info-sign', prefix: 'fa', markerColor: colors[row[2]]
+                })
+            });
+            marker.bindPopup(function () {
+                return '<b>Category:</b> ' + escapeHtml(category) + '<br>' +
+                    '<b>Sentiment:</b> ' + escapeHtml(sentiments[row[3]]) + '<br>' +
+                    '<b>Feedback:</b> ' + escapeHtml(texts[row[4]]) + '...';
+            });
+            return marker;
+        };
+    })()""")
+
+    def __init__(self, df, colors=CATEGORY_COLORS, text_chars=100, **kwargs):
+        df = _located(df)
+        category_codes, categories = _codes(df['category'])
+        sentiment_codes, sentiments = _codes(df['sentiment'])
+        callback = self._callback.render(
+            categories=_js_literal(categories),
+            sentiments=_js_literal(sentiments),
+            colors=_js_literal([colors.get(category, 'gray') for category in categories]),
+            texts=_js_literal(df['text'].astype(str).str.slice(0, text_chars).tolist())
+        )
+        super().__init__([], callback=callback, **kwargs)
+        # Assign rows directly: the parent validates every row one by one in Python
+        self.data = list(zip(
+            np.round(df['latitude'].to_numpy(dtype=float), COORDINATE_DECIMALS).tolist(),
+            np.round(df['longitude'].to_numpy(dtype=float), COORDINATE_DECIMALS).tolist(),
+            category_codes,
+            sentiment_codes,
+            range(len(df))
+        ))
+
+
+class CompactPointLayer(Layer):
+    """
+    Many small circle markers drawn on one shared canvas renderer, shipped as
+    [lat, lon, color index] rows instead of one Leaflet object definition per point.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var data = {{ this.data|tojson }};
+                var colors = {{ this.colors|tojson }};
+                var renderer = L.canvas();
+                var group = L.featureGroup();
+                for (var i = 0; i < data.length; i++) {
+                    L.circleMarker([data[i][0], data[i][1]], {
+                        renderer: renderer,
+                        radius: {{ this.radius }},
+                        color: colors[data[i][2]],
+                        fill: true,
+                        fillOpacity: {{ this.fill_opacity }}
+                    }).addTo(group);
+                }
+                group.addTo({{ this._parent.get_name() }});
+                return group;
+            })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, latitudes, longitudes, color_index, colors, radius=5, fill_opacity=0.5,
+                 name=None, overlay=True, control=True, show=True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "CompactPointLayer"
+        self.colors = list(colors)
+        self.radius = radius
+        self.fill_opacity = fill_opacity
+        self.data = list(zip(
+            np.round(np.asarray(latitudes, dtype=float), COORDINATE_DECIMALS).tolist(),
+            np.round(np.asarray(longitudes, dtype=float), COORDINATE_DECIMALS).tolist(),
+            np.asarray(color_index, dtype=int).tolist()
+        ))
+
+
+class BinnedHeatMap(HeatMap):
+    """
+    Heatmap fed from a server-side bin pyramid (see modules.spatial_binning) instead
+    of raw points. The browser only receives bin centroids and weights, swaps levels
+    on zoom, and can narrow facets with layer.setFacetFilter({facet: [codes]}).
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var pyramid = {{ this.payload|tojson }};
+                var map = {{ this.map_name }};
+                var layer = L.heatLayer([], {{ this.options|tojson }});
+                var filter = {};
+                function nearestZoom(zoom) {
+                    var best = pyramid.zooms[0];
+                    pyramid.zooms.forEach(function (level) {
+                        if (Math.abs(level - zoom) < Math.abs(best - zoom)) { best = level; }
+                    });
+                    return best;
+                }
+                function redraw() {
+                    var rows = pyramid.bins[nearestZoom(map.getZoom())];
+                    var points = [];
+                    for (var i = 0; i < rows.length; i++) {
+                        var keep = true;
+                        for (var f = 0; f < pyramid.facets.length && keep; f++) {
+                            var allowed = filter[pyramid.facets[f]];
+                            keep = !allowed || allowed.indexOf(rows[i][3 + f]) !== -1;
+                        }
+                        if (keep) { points.push([rows[i][0], rows[i][1], rows[i][2]]); }
+                    }
+                    layer.setLatLngs(points);
+                }
+                layer.setFacetFilter = function (facetFilter) {
+                    filter = facetFilter || {};
+                    redraw();
+                };
+                layer.pyramid = pyramid;
+                map.on('zoomend', redraw);
+                redraw();
+                return layer.addTo({{ this._parent.get_name() }});
+            })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, pyramid, **kwargs):
+        super().__init__([], **kwargs)
+        self._name = "BinnedHeatMap"
+        self.payload = pyramid_payload(pyramid)
+        self.map_name = None
+
+    def render(self, **kwargs):
+        self.map_name = get_obj_in_upper_tree(self, Map).get_name()
+        super().render(**kwargs)
+
+
+def cluster_points_layer(clustered_df, colors, name="Cluster members"):
+    """One CompactPointLayer for every non-noise point, colored by cluster id"""
+    members = _located(clustered_df[clustered_df['cluster'] != -1])
+    return CompactPointLayer(
+        members['latitude'].to_numpy(),
+        members['longitude'].to_numpy(),
+        members['cluster'].to_numpy() % len(colors),
+        colors,
+        name=name
+    )
+
+
+def _synthetic_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'latitude': rng.uniform(8, 34, n),
+        'longitude': rng.uniform(68, 92, n),
+        'category': rng.choice(list(CATEGORY_COLORS), n),
+        'sentiment': rng.choice(['Positive', 'Negative', 'Neutral'], n),
+        'text': [f"Synthetic report {i} about a civic issue in the neighbourhood" for i in range(n)]
+    })
+
+
+def _legacy_map(df):
+    """The previous per-row folium.Marker rendering, kept for benchmarking"""
+    import folium
+    from folium.plugins import MarkerCluster
+
+    m = folium.Map(location=[20.5937, 78.9629], zoom_start=5)
+    marker_cluster = MarkerCluster().add_to(m)
+    for _, row in df.iterrows():
+        folium.Marker(
+            [row['latitude'], row['longitude']],
+            popup=f"<b>Category:</b> {row['category']}<br><b>Sentiment:</b> {row['sentiment']}<br><b>Feedback:</b> {row['text'][:100]}...",
+            icon=folium.Icon(color=CATEGORY_COLORS.get(row['category'], 'gray'), icon='info-sign', prefix='fa')
+        ).add_to(marker_cluster)
+    return m
+
+
+def _lazy_map(df):
+    import folium
+
+    m = folium.Map(location=[20.5937, 78.9629], zoom_start=5)
+    LazyPopupMarkerCluster(df).add_to(m)
+    return m
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m modules.map_rendering [--legacy]
+    import sys
+    import time
+
+    sizes = [10_000, 100_000]
+    builders = [("lazy", _lazy_map)]
+    if "--legacy" in sys.argv:
+        builders.append(("legacy", _legacy_map))
+    for n in sizes:
+        df = _synthetic_frame(n)
+        for label, build in builders:
+            start = time.perf_counter()
+            html = build(df).get_root().render()
+            elapsed = time.perf_counter() - start
+            print(f"{label:>6} {n:>7} points: {elapsed:6.2f} s, {len(html.encode('utf-8')) / 1e6:7.2f} MB HTML")
@@ -1,127 +1,118 @@
+import argparse
+import gzip
 import json
+import os
+import sys
 import folium
-from folium.plugins import HeatMap, MarkerCluster
-from folium import Marker
-from folium.map import Icon
-from folium import MacroElement
+import numpy as np
+import pandas as pd
 from jinja2 import Template
 
-# Load feedback results with explicit UTF-8 encoding
-try:
-    with open('../data/feedback_results_with_location.json', 'r', encoding='utf-8') as file:
-        feedback_data = json.load(file)
-    print(f"Loaded {len(feedback_data)} feedback entries")
-except UnicodeDecodeError as e:
-    print(f"Error: Failed to decode JSON file. Ensure the file is encoded in UTF-8. Details: {e}")
-    exit(1)
-except FileNotFoundError:
-    print("Error: JSON file not found at '../data/feedback_results_with_location.json'.")
-    exit(1)
-except json.JSONDecodeError as e:
-    print(f"Error: Invalid JSON format. Details: {e}")
-    exit(1)
-
-# Define a basic map centered on India with a cleaner tileset
-map_center = [20.5937, 78.9629]  # India Center
-mymap = folium.Map(
-    location=map_center,
-    zoom_start=5,
-    tiles='CartoDB Positron',
-    attr='© <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors © <a href="https://carto.com/attributions">CARTO</a>'
-)
-
-# Create feature groups for heatmap and markers (for layer control)
-heatmap_layer = folium.FeatureGroup(name='Heatmap', show=True)
-marker_layer = folium.FeatureGroup(name='Markers', show=True)
-
-# Prepare data for the initial heatmap and markers
-heat_data = []
-filtered_feedback = []
-
-# Filter feedback (initially no filters, will be controlled via JS)
-for entry in feedback_data:
-    lat = entry.get('latitude')
-    lon = entry.get('longitude')
-    
-    if lat and lon:
-        # Add to heatmap data
-        heat_data.append([lat, lon])
-        # Prepare feedback for markers
-        filtered_feedback.append(entry)
-
-# Add HeatMap layer with refined parameters, ensuring gradient keys are strings
-HeatMap(
-    heat_data,
-    radius=12,
-    blur=8,
-    max_zoom=13,
-    gradient={
-        "0.2": "blue",
-        "0.4": "lime",
-        "0.6": "yellow",
-        "0.8": "orange",
-        "1.0": "red"
+# Paths are relative to the project root so the script runs from any directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(PROJECT_ROOT, 'data', 'feedback_results_with_location.json')
+OUTPUT_PATH = os.path.join(PROJECT_ROOT, 'outputs', 'interactive_heatmap_with_filters.html')
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+from modules.map_rendering import BinnedHeatMap
+from modules.spatial_binning import build_bin_pyramid
+
+FACETS = ['sentiment', 'emotion', 'category']
+
+# Coordinates are shipped as integers in units of 1e-5 degrees (~1 m)
+COORDINATE_SCALE = 100000
+
+
+def load_feedback(path=DATA_PATH):
+    """Load feedback results with explicit UTF-8 encoding"""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            feedback_data = json.load(file)
+        print(f"Loaded {len(feedback_data)} feedback entries")
+        return feedback_data
+    except UnicodeDecodeError as e:
+        print(f"Error: Failed to decode JSON file. Ensure the file is encoded in UTF-8. Details: {e}")
+        exit(1)
+    except FileNotFoundError:
+        print(f"Error: JSON file not found at '{path}'.")
+        exit(1)
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON format. Details: {e}")
+        exit(1)
+
+
+def encode_feedback(feedback_data):
+    """
+    Split located feedback into two compact columnar payloads:
+    - columns: quantized coordinates plus dictionary-encoded facets, needed to draw and filter
+    - details: user, text and timestamp, only needed when a popup is opened
+    Both are aligned by row number.
+
+    Rows are ordered by their sentiment x emotion x category combination, so the
+    posting list of every combination is one contiguous row range; columns['index']
+    holds the combinations and their start offsets.
+    """
+    df = pd.DataFrame(feedback_data, columns=['text', 'user', 'latitude', 'longitude', 'timestamp'] + FACETS)
+    df = df[df['latitude'].notna() & df['longitude'].notna() & (df['latitude'] != 0) & (df['longitude'] != 0)]
+
+    categoricals = {facet: pd.Categorical(df[facet].fillna('').astype(str)) for facet in FACETS}
+    codes = np.column_stack([categoricals[facet].codes for facet in FACETS]).astype(np.int64)
+    order = np.lexsort(codes.T[::-1]) if len(df) else np.arange(0)
+    df = df.iloc[order]
+    codes = codes[order]
+
+    # Start offset of each distinct combination in the sorted rows
+    if len(codes):
+        starts = np.flatnonzero(np.r_[True, np.any(codes[1:] != codes[:-1], axis=1)])
+    else:
+        starts = np.arange(0)
+
+    facets = {}
+    for i, facet in enumerate(FACETS):
+        facets[facet] = {
+            'labels': [str(label) for label in categoricals[facet].categories],
+            'codes': codes[:, i].tolist()
+        }
+    columns = {
+        'n': len(df),
+        'scale': COORDINATE_SCALE,
+        'lat': (df['latitude'].astype(float) * COORDINATE_SCALE).round().astype(int).tolist(),
+        'lon': (df['longitude'].astype(float) * COORDINATE_SCALE).round().astype(int).tolist(),
+        'facets': facets,
+        'index': {
+            'facets': FACETS,
+            'combos': codes[starts].tolist(),
+            'offsets': starts.tolist() + [len(df)]
+        }
     }
-).add_to(heatmap_layer)
+    details = {
+        'user': df['user'].fillna('').astype(str).tolist(),
+        'text': df['text'].fillna('').astype(str).tolist(),
+        'timestamp': df['timestamp'].fillna('').astype(str).tolist()
+    }
+    return df, columns, details
 
-# Add heatmap layer to map
-heatmap_layer.add_to(mymap)
 
-# Create a MarkerCluster for better visualization of dense marker areas
-marker_cluster = MarkerCluster().add_to(marker_layer)
+def write_sidecar(payload, path, compress=False):
+    """Write a payload as minified JSON, gzip-compressed when requested"""
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if compress:
+        with gzip.open(path, 'wb') as file:
+            file.write(data)
+    else:
+        with open(path, 'wb') as file:
+            file.write(data)
+    return len(data)
 
-# Add custom markers for different categories with color-coding
-category_colors = {
-    'Health': 'green',
-    'Education': 'blue',
-    'Infrastructure': 'orange',
-    'Environment': 'purple',
-    'Public Safety': 'red'
-}
 
-# Add custom markers for each entry in filtered feedback
-for entry in filtered_feedback:
-    lat = entry.get('latitude')
-    lon = entry.get('longitude')
-    
-    if lat and lon:
-        # Set a color based on category
-        category = entry['category']
-        marker_color = category_colors.get(category, 'gray')
-        
-        # Prepare the popup message with styled HTML
-        popup_message = f"""
-        <div style="font-family: Arial; font-size: 12px; padding: 10px; max-width: 300px;">
-            <b style="color: #333;">User:</b> {entry['user']}<br>
-            <b style="color: #333;">Sentiment:</b> {entry['sentiment']}<br>
-            <b style="color: #333;">Emotion:</b> {entry['emotion']}<br>
-            <b style="color: #333;">Category:</b> {entry['category']}<br>
-            <b style="color: #333;">Feedback:</b> {entry['text']}<br>
-            <b style="color: #333;">Timestamp:</b> {entry['timestamp']}
-        </div>
-        """
-        
-        # Add custom marker with an icon and styled popup
-        folium.Marker(
-            location=[lat, lon],
-            popup=folium.Popup(popup_message, max_width=300),
-            icon=Icon(color=marker_color, icon='info-sign', prefix='fa')
-        ).add_to(marker_cluster)
-
-# Add marker layer to map
-marker_layer.add_to(mymap)
-
-# Convert feedback data to JSON for client-side filtering
-feedback_json = json.dumps(feedback_data)
-
-# Add Leaflet.AwesomeMarkers resources to the map's header
-mymap.get_root().header.add_child(folium.Element('''
-<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.css" />
-<script src="https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.min.js"></script>
-'''))
+def _sidecar_paths(output_path, compress):
+    stem, _ = os.path.splitext(output_path)
+    suffix = '.json.gz' if compress else '.json'
+    return stem + '.data' + suffix, stem + '.details' + suffix
+
 
-# Add a polished, collapsible legend
-legend_html = '''
+LEGEND_HTML = '''
 <div style="position: fixed; bottom: 50px; left: 50px; width: 220px; background-color: rgba(255, 255, 255, 0.9);
             z-index:9999; font-size: 12px; border: 2px solid #ccc; border-radius: 5px; padding: 10px;
             font-family: Arial;">
@@ -152,13 +143,37 @@ function toggleLegend() {
 </script>
 '''
 
-mymap.get_root().html.add_child(folium.Element(legend_html))
+# Filter index logic shared by the page and the headless benchmark; no DOM or Leaflet use
+FILTER_INDEX_JS = '''
+// Flags for the index combinations allowed by {facet: [codes]} (a missing facet allows all)
+function selectCombos(index, codes) {
+    var selected = new Uint8Array(index.combos.length);
+    for (var c = 0; c < index.combos.length; c++) {
+        var keep = true;
+        for (var f = 0; f < index.facets.length && keep; f++) {
+            var allowed = codes[index.facets[f]];
+            keep = !allowed || allowed.indexOf(index.combos[c][f]) !== -1;
+        }
+        selected[c] = keep ? 1 : 0;
+    }
+    return selected;
+}
 
-# Add layer control to toggle heatmap and markers
-folium.LayerControl().add_to(mymap)
+// Rows entering and leaving the view when the selection changes; untouched combinations cost nothing
+function diffCombos(index, previous, next) {
+    var added = [];
+    var removed = [];
+    for (var c = 0; c < next.length; c++) {
+        if (previous[c] === next[c]) continue;
+        var target = next[c] ? added : removed;
+        for (var row = index.offsets[c]; row < index.offsets[c + 1]; row++) target.push(row);
+    }
+    return {added: added, removed: removed};
+}
+'''
 
-# Add a control panel for dynamic filtering with client-side JavaScript
-control_panel_html = f'''
+# Control panel for dynamic filtering with client-side JavaScript
+CONTROL_PANEL_TEMPLATE = Template('''
 <div style="position: fixed; top: 10px; right: 10px; width: 250px; background-color: rgba(255, 255, 255, 0.9);
             z-index:9999; font-size: 12px; border: 2px solid #ccc; border-radius: 5px; padding: 10px;
             font-family: Arial;">
@@ -192,136 +207,386 @@ control_panel_html = f'''
     <button onclick="applyFilters()" style="width: 100%; padding: 5px; background-color: #4CAF50; color: white; border: none; border-radius: 3px; cursor: pointer;">Apply Filters</button>
 </div>
 <script>
-// Feedback data embedded in the HTML
-var feedbackData = {feedback_json};
+// Either {inline: {columns, details}} or {columnsUrl, detailsUrl, gzip} for sidecar files
+var feedbackSource = {{ source|tojson }};
+
+var feedbackColumns = null;
+var detailsPromise = null;
 
 // Map and layer references
 var map = null;
-var heatmapFeatureGroup = null;
 var markerFeatureGroup = null;
-var currentHeatLayer = null;
-var currentMarkerCluster = null;
-
-// Initialize the map and layers after the map is loaded
-document.addEventListener('DOMContentLoaded', function() {{
-    try {{
-        map = window.map_1; // Folium's default map ID
-        
-        // Find existing layers by name
-        map.eachLayer(function(layer) {{
-            if (layer.options && layer.options.name === 'Heatmap') {{
-                heatmapFeatureGroup = layer;
-            }} else if (layer.options && layer.options.name === 'Markers') {{
-                markerFeatureGroup = layer;
-            }}
-        }});
-
-        if (!heatmapFeatureGroup || !markerFeatureGroup) {{
-            console.error('Could not find Heatmap or Markers layers');
-            return;
-        }}
-
-        console.log('Map initialized with ' + feedbackData.length + ' feedback entries');
-        applyFilters(); // Initial render
-    }} catch (e) {{
-        console.error('Error initializing map: ', e);
-    }}
-}});
-
-function applyFilters() {{
-    try {{
-        // Get filter values
-        var sentiment = document.getElementById('sentiment-filter').value.toLowerCase();
-        var emotion = document.getElementById('emotion-filter').value.toLowerCase();
-        var category = document.getElementById('category-filter').value.toLowerCase();
-
-        // Filter feedback data
-        var filteredData = feedbackData.filter(function(entry) {{
-            var entrySentiment = entry.sentiment ? entry.sentiment.toLowerCase() : '';
-            var entryEmotion = entry.emotion ? entry.emotion.toLowerCase() : '';
-            var entryCategory = entry.category ? entry.category.toLowerCase() : '';
-
-            return (
-                (sentiment === '' || entrySentiment === sentiment) &&
-                (emotion === '' || entryEmotion === emotion) &&
-                (category === '' || entryCategory === category)
-            );
-        }});
-
-        console.log('Filtered ' + filteredData.length + ' entries');
-
-        // Update Heatmap Layer
-        if (currentHeatLayer) {{
-            heatmapFeatureGroup.removeLayer(currentHeatLayer);
-        }}
-        
-        if (filteredData.length > 0) {{
-            var heatData = filteredData.map(function(entry) {{
-                return [entry.latitude, entry.longitude];
-            }});
-            currentHeatLayer = L.heatLayer(heatData, {{
-                radius: 12,
-                blur: 8,
-                maxZoom: 13,
-                gradient: {{ '0.2': 'blue', '0.4': 'lime', '0.6': 'yellow', '0.8': 'orange', '1.0': 'red' }}
-            }});
-            heatmapFeatureGroup.addLayer(currentHeatLayer);
-        }}
-
-        // Update Marker Layer
-        if (currentMarkerCluster) {{
-            markerFeatureGroup.removeLayer(currentMarkerCluster);
-        }}
-        
-        var markerCluster = L.markerClusterGroup();
-        var categoryColors = {{
-            'health': 'green',
-            'education': 'blue',
-            'infrastructure': 'orange',
-            'environment': 'purple',
-            'public safety': 'red'
-        }};
-
-        filteredData.forEach(function(entry) {{
-            if (!entry.latitude || !entry.longitude) return;
-
-            var popupMessage = `<div style="font-family: Arial; font-size: 12px; padding: 10px; max-width: 300px;">
-                <b>User:</b> ${{entry.user}}<br>
-                <b>Sentiment:</b> ${{entry.sentiment}}<br>
-                <b>Emotion:</b> ${{entry.emotion}}<br>
-                <b>Category:</b> ${{entry.category}}<br>
-                <b>Feedback:</b> ${{entry.text}}<br>
-                <b>Timestamp:</b> ${{entry.timestamp}}
-            </div>`;
-
-            var markerColor = categoryColors[entry.category.toLowerCase()] || 'gray';
-            var marker = L.marker([entry.latitude, entry.longitude], {{
-                icon: L.AwesomeMarkers.icon({{
-                    icon: 'info-sign',
-                    prefix: 'fa',
-                    markerColor: markerColor
-                }})
-            }}).bindPopup(popupMessage, {{ maxWidth: 300 }});
-            
-            markerCluster.addLayer(marker);
-        }});
-
-        currentMarkerCluster = markerCluster;
-        markerFeatureGroup.addLayer(currentMarkerCluster);
-
-    }} catch (e) {{
+var binnedHeatLayer = null;
+var markerCluster = null;
+var markers = [];
+var currentSelection = new Uint8Array(0);
+
+var categoryColors = {
+    'health': 'green',
+    'education': 'blue',
+    'infrastructure': 'orange',
+    'environment': 'purple',
+    'public safety': 'red'
+};
+
+function fetchJson(url, gzipped) {
+    return fetch(url).then(function(response) {
+        if (!response.ok) throw new Error('Failed to load ' + url + ': ' + response.status);
+        if (!gzipped) return response.json();
+        var stream = response.body.pipeThrough(new DecompressionStream('gzip'));
+        return new Response(stream).json();
+    });
+}
+
+function loadColumns() {
+    if (feedbackSource.inline) return Promise.resolve(feedbackSource.inline.columns);
+    return fetchJson(feedbackSource.columnsUrl, feedbackSource.gzip);
+}
+
+// Text, user and timestamp are only fetched the first time a popup opens
+function loadDetails() {
+    if (!detailsPromise) {
+        detailsPromise = feedbackSource.inline
+            ? Promise.resolve(feedbackSource.inline.details)
+            : fetchJson(feedbackSource.detailsUrl, feedbackSource.gzip);
+    }
+    return detailsPromise;
+}
+
+function escapeHtml(value) {
+    return String(value).replace(/[&<>"']/g, function(c) {
+        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+    });
+}
+
+function facetLabel(facet, row) {
+    var column = feedbackColumns.facets[facet];
+    return column.labels[column.codes[row]];
+}
+
+function popupHtml(row, details) {
+    return '<div style="font-family: Arial; font-size: 12px; padding: 10px; max-width: 300px;">' +
+        '<b>User:</b> ' + escapeHtml(details.user[row]) + '<br>' +
+        '<b>Sentiment:</b> ' + escapeHtml(facetLabel('sentiment', row)) + '<br>' +
+        '<b>Emotion:</b> ' + escapeHtml(facetLabel('emotion', row)) + '<br>' +
+        '<b>Category:</b> ' + escapeHtml(facetLabel('category', row)) + '<br>' +
+        '<b>Feedback:</b> ' + escapeHtml(details.text[row]) + '<br>' +
+        '<b>Timestamp:</b> ' + escapeHtml(details.timestamp[row]) +
+        '</div>';
+}
+
+function createMarker(row) {
+    var scale = feedbackColumns.scale;
+    var category = facetLabel('category', row).toLowerCase();
+    var marker = L.marker([feedbackColumns.lat[row] / scale, feedbackColumns.lon[row] / scale], {
+        icon: L.AwesomeMarkers.icon({
+            icon: 'info-sign',
+            prefix: 'fa',
+            markerColor: categoryColors[category] || 'gray'
+        })
+    }).bindPopup('Loading...', { maxWidth: 300 });
+    marker.on('popupopen', function() {
+        loadDetails().then(function(details) {
+            marker.setPopupContent(popupHtml(row, details));
+        });
+    });
+    return marker;
+}
+
+// Codes per facet whose label matches the selected value ('' means no restriction)
+function selectedCodes(selected) {
+    var codes = {};
+    Object.keys(selected).forEach(function(facet) {
+        if (selected[facet] === '') return;
+        codes[facet] = [];
+        feedbackColumns.facets[facet].labels.forEach(function(label, code) {
+            if (label.toLowerCase() === selected[facet]) codes[facet].push(code);
+        });
+    });
+    return codes;
+}
+
+{{ filter_index_js }}
+
+function markerFor(row) {
+    if (!markers[row]) markers[row] = createMarker(row);
+    return markers[row];
+}
+
+function applyFilters() {
+    if (!feedbackColumns) return;
+    try {
+        var codes = selectedCodes({
+            sentiment: document.getElementById('sentiment-filter').value.toLowerCase(),
+            emotion: document.getElementById('emotion-filter').value.toLowerCase(),
+            category: document.getElementById('category-filter').value.toLowerCase()
+        });
+        var selection = selectCombos(feedbackColumns.index, codes);
+        var diff = diffCombos(feedbackColumns.index, currentSelection, selection);
+        currentSelection = selection;
+
+        // Update Heatmap Layer by narrowing the pre-binned facets
+        var heatFilter = {};
+        Object.keys(codes).forEach(function(facet) {
+            heatFilter[facet] = codes[facet].map(function(code) {
+                return binnedHeatLayer.pyramid.labels[facet].indexOf(feedbackColumns.facets[facet].labels[code]);
+            });
+        });
+        binnedHeatLayer.setFacetFilter(heatFilter);
+
+        // Update Marker Layer with only the rows that changed
+        markerCluster.removeLayers(diff.removed.map(markerFor));
+        markerCluster.addLayers(diff.added.map(markerFor));
+        console.log('Filter added ' + diff.added.length + ' and removed ' + diff.removed.length + ' markers');
+    } catch (e) {
         console.error('Error applying filters: ', e);
-    }}
-}}
+    }
+}
+
+// Initialize the layers once the map scripts have run, then load the data
+document.addEventListener('DOMContentLoaded', function() {
+    map = {{ map_name }};
+    markerFeatureGroup = {{ marker_layer_name }};
+    binnedHeatLayer = {{ heat_layer_name }};
+    loadColumns().then(function(columns) {
+        feedbackColumns = columns;
+        markers = new Array(columns.n);
+        currentSelection = new Uint8Array(columns.index.combos.length);
+        markerCluster = L.markerClusterGroup();
+        markerFeatureGroup.addLayer(markerCluster);
+        console.log('Map initialized with ' + feedbackColumns.n + ' feedback entries');
+        applyFilters(); // Initial render
+    }).catch(function(e) {
+        console.error('Error loading feedback data: ', e);
+    });
+});
 </script>
-'''
+''')
+
+
+def build_map(feedback_data, sidecar_urls=None, compress=False):
+    """
+    Build the interactive heatmap page. Feedback rows are encoded once, columnar; with
+    sidecar_urls=(columns_url, details_url) they are fetched from separate files instead
+    of being inlined. Returns (map, columns payload, details payload).
+    """
+    df, columns, details = encode_feedback(feedback_data)
+
+    # Define a basic map centered on India with a cleaner tileset
+    map_center = [20.5937, 78.9629]  # India Center
+    mymap = folium.Map(
+        location=map_center,
+        zoom_start=5,
+        tiles='CartoDB Positron',
+        attr='© <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors © <a href="https://carto.com/attributions">CARTO</a>'
+    )
+
+    # Create feature groups for heatmap and markers (for layer control)
+    heatmap_layer = folium.FeatureGroup(name='Heatmap', show=True)
+    marker_layer = folium.FeatureGroup(name='Markers', show=True)
+
+    # Pre-bin points per zoom level and facet so the heatmap ships bin centroids, not raw points
+    heat_layer = BinnedHeatMap(
+        build_bin_pyramid(df, facets=FACETS),
+        radius=12,
+        blur=8,
+        max_zoom=13,
+        gradient={
+            "0.2": "blue",
+            "0.4": "lime",
+            "0.6": "yellow",
+            "0.8": "orange",
+            "1.0": "red"
+        }
+    ).add_to(heatmap_layer)
+    heatmap_layer.add_to(mymap)
+
+    # Markers are created in the browser from the columnar payload
+    marker_layer.add_to(mymap)
+
+    # Add Leaflet.AwesomeMarkers and MarkerCluster resources to the map's header
+    mymap.get_root().header.add_child(folium.Element('''
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.css" />
+<script src="https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.min.js"></script>
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.css" />
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.Default.css" />
+<script src="https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/leaflet.markercluster.js"></script>
+'''))
 
-mymap.get_root().html.add_child(folium.Element(control_panel_html))
+    # Add a polished, collapsible legend
+    mymap.get_root().html.add_child(folium.Element(LEGEND_HTML))
+
+    # Add layer control to toggle heatmap and markers
+    folium.LayerControl().add_to(mymap)
+
+    if sidecar_urls:
+        source = {'columnsUrl': sidecar_urls[0], 'detailsUrl': sidecar_urls[1], 'gzip': compress}
+    else:
+        source = {'inline': {'columns': columns, 'details': details}}
+    control_panel_html = CONTROL_PANEL_TEMPLATE.render(
+        source=source,
+        filter_index_js=FILTER_INDEX_JS,
+        map_name=mymap.get_name(),
+        marker_layer_name=marker_layer.get_name(),
+        heat_layer_name=heat_layer.get_name()
+    )
+    mymap.get_root().html.add_child(folium.Element(control_panel_html))
+    return mymap, columns, details
+
+
+def _synthetic_feedback(n, seed=0):
+    rng = np.random.default_rng(seed)
+    sentiments = ['Positive', 'Neutral', 'Negative']
+    emotions = ['happiness', 'sadness', 'fear', 'disgust', 'surprise', 'anger', 'neutral']
+    categories = ['Health', 'Education', 'Infrastructure', 'Environment', 'Public Safety', 'Uncategorized']
+    return [
+        {
+            'text': f"Synthetic report {i} about a civic issue",
+            'user': f"user{i}",
+            'latitude': float(lat),
+            'longitude': float(lon),
+            'timestamp': '2024-01-01 00:00:00',
+            'sentiment': sentiments[s],
+            'emotion': emotions[e],
+            'category': categories[c]
+        }
+        for i, (lat, lon, s, e, c) in enumerate(zip(
+            rng.uniform(8, 34, n), rng.uniform(68, 92, n),
+            rng.integers(0, len(sentiments), n), rng.integers(0, len(emotions), n),
+            rng.integers(0, len(categories), n)
+        ))
+    ]
+
+
+# Replays a fixed sequence of filter changes with the indexed diff and with the previous
+# full scan over row objects (lowercasing every field and rebuilding the whole row list)
+BENCHMARK_JS = Template('''
+{{ filter_index_js }}
+var columns = {{ columns }};
+var changes = {{ changes }};
+
+var feedbackData = [];
+for (var row = 0; row < columns.n; row++) {
+    feedbackData.push({
+        sentiment: columns.facets.sentiment.labels[columns.facets.sentiment.codes[row]],
+        emotion: columns.facets.emotion.labels[columns.facets.emotion.codes[row]],
+        category: columns.facets.category.labels[columns.facets.category.codes[row]]
+    });
+}
+
+function selectedCodes(selected) {
+    var codes = {};
+    Object.keys(selected).forEach(function(facet) {
+        if (selected[facet] === '') return;
+        codes[facet] = [];
+        columns.facets[facet].labels.forEach(function(label, code) {
+            if (label.toLowerCase() === selected[facet]) codes[facet].push(code);
+        });
+    });
+    return codes;
+}
+
+function time(run) {
+    var start = process.hrtime.bigint();
+    var touched = 0;
+    changes.forEach(function(change) { touched += run(change); });
+    return [Number(process.hrtime.bigint() - start) / 1e6 / changes.length, touched / changes.length];
+}
 
-# Save the map to an HTML file with error handling
-try:
-    mymap.save('../outputs/interactive_heatmap_with_filters.html')
-    print("✅ Enhanced interactive map with functional filters, clustering, and improved styling saved to 'outputs/interactive_heatmap_with_filters.html'")
-except Exception as e:
-    print(f"Error: Failed to save the map. Details: {e}")
-    exit(1)
\ No newline at end of file
+var selection = new Uint8Array(columns.index.combos.length);
+var indexed = time(function(change) {
+    var next = selectCombos(columns.index, selectedCodes(change));
+    var diff = diffCombos(columns.index, selection, next);
+    selection = next;
+    return diff.added.length + diff.removed.length;
+});
+var scan = time(function(change) {
+    var rows = feedbackData.filter(function(entry) {
+        return (change.sentiment === '' || entry.sentiment.toLowerCase() === change.sentiment) &&
+            (change.emotion === '' || entry.emotion.toLowerCase() === change.emotion) &&
+            (change.category === '' || entry.category.toLowerCase() === change.category);
+    });
+    return columns.n + rows.length;
+});
+console.log(JSON.stringify({indexed: indexed, scan: scan}));
+''')
+
+
+def benchmark_filters(n=50000, changes=200, seed=0):
+    """
+    Headless filter latency benchmark: runs the page's filter index code under node
+    on n synthetic rows and prints per-change latency and rows touched.
+    """
+    import shutil
+    import subprocess
+    import tempfile
+    import time
+
+    node = shutil.which('node')
+    if node is None:
+        print("node is required to run the filter benchmark")
+        return None
+
+    start = time.perf_counter()
+    _, columns, _ = encode_feedback(_synthetic_feedback(n, seed))
+    encode_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed)
+    options = {facet: [''] + [label.lower() for label in columns['facets'][facet]['labels']] for facet in FACETS}
+    sequence = [{facet: str(rng.choice(options[facet])) for facet in FACETS} for _ in range(changes)]
+    script = BENCHMARK_JS.render(
+        filter_index_js=FILTER_INDEX_JS,
+        columns=json.dumps(columns, separators=(',', ':')),
+        changes=json.dumps(sequence)
+    )
+    with tempfile.NamedTemporaryFile('w', suffix='.js', delete=False, encoding='utf-8') as file:
+        file.write(script)
+    try:
+        output = subprocess.run([node, file.name], capture_output=True, text=True, check=True).stdout
+    finally:
+        os.unlink(file.name)
+    result = json.loads(output)
+
+    print(f"{n} rows, {len(columns['index']['combos'])} facet combinations, index built in {encode_seconds:.2f} s")
+    for label in ('indexed', 'scan'):
+        latency, touched = result[label]
+        print(f"{label:>8}: {latency:7.3f} ms per filter change, {touched:9.0f} rows touched")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the interactive feedback heatmap")
+    parser.add_argument("--input", default=DATA_PATH, help="Feedback results JSON")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="HTML file to write")
+    parser.add_argument("--sidecar", action="store_true", help="Write feedback data to separate files loaded by the page instead of inlining it")
+    parser.add_argument("--gzip", action="store_true", help="With --sidecar, gzip the data files (decoded in the browser)")
+    parser.add_argument("--benchmark-filters", type=int, nargs="?", const=50000, metavar="ROWS",
+                        help="Only run the headless filter latency benchmark (default 50000 rows)")
+    args = parser.parse_args()
+
+    if args.benchmark_filters:
+        benchmark_filters(args.benchmark_filters)
+        return
+
+    feedback_data = load_feedback(args.input)
+
+    sidecar_paths = _sidecar_paths(args.output, args.gzip) if args.sidecar else None
+    sidecar_urls = tuple(os.path.basename(path) for path in sidecar_paths) if sidecar_paths else None
+    mymap, columns, details = build_map(feedback_data, sidecar_urls=sidecar_urls, compress=args.gzip)
+
+    # Save the map (and sidecar files) with error handling
+    try:
+        if sidecar_paths:
+            for payload, path in zip((columns, details), sidecar_paths):
+                write_sidecar(payload, path, compress=args.gzip)
+                print(f"Wrote {os.path.getsize(path)} bytes to '{path}'")
+            print("Note: sidecar files are fetched by the page, so serve the outputs folder over HTTP")
+        mymap.save(args.output)
+        print(f"✅ Enhanced interactive map with functional filters, clustering, and improved styling saved to '{args.output}'")
+    except Exception as e:
+        print(f"Error: Failed to save the map. Details: {e}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+
+from modules.categorizer import get_default_categorizer
+from modules.sentiment_analysis import analyze_batch, get_emotion_analyzer, get_sentiment_analyzer
+
+
+def iter_feedback(path, chunk_size=1 << 20):
+    """
+    Lazily yield feedback records from either a JSONL file (one object per line)
+    or a JSON array, reading at most chunk_size characters at a time.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        head = ""
+        while True:
+            char = file.read(1)
+            if not char or not char.isspace():
+                head = char
+                break
+        if head == "[":
+            yield from _iter_json_array(file, chunk_size)
+        elif head:
+            yield from _iter_jsonl(itertools.chain([head + file.readline()], file))
+
+
+def _iter_jsonl(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_json_array(file, chunk_size):
+    """Incrementally decode the elements of a JSON array whose opening '[' was already consumed"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    while True:
+        # Skip separators between elements
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ","):
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        if position < len(buffer):
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # A number cut by the chunk boundary ("45" of "456", "7." of "7.5") decodes
+                # too; only trust values followed by a separator, or at end of input
+                if eof or (end < len(buffer) and (buffer[end].isspace() or buffer[end] in ",]")):
+                    yield record
+                    position = end
+                    continue
+        elif eof:
+            raise ValueError("Unexpected end of JSON array")
+        # Need more input: drop consumed text and read the next chunk
+        buffer = buffer[position:]
+        position = 0
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _init_worker():
+    """Pool initializer: load every model once per worker process"""
+    # Each worker gets one core; letting torch spawn a thread per core in every worker oversubscribes
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("MKL_NUM_THREADS", "1")
+    get_sentiment_analyzer()
+    get_emotion_analyzer()
+    get_default_categorizer()
+
+
+def _analyze_texts(texts, batch_size):
+    if not texts:
+        # Fully cached batch: nothing to run through the models
+        return {"sentiment": [], "emotion": [], "category": []}
+    return analyze_batch(texts, batch_size=batch_size)
+
+
+class AnalysisPool:
+    """
+    Runs analyze_batch for batches of texts on a pool of worker processes.
+
+    Results come back in submission order; at most pending_per_worker batches per
+    worker are in flight, so memory stays bounded when streaming large inputs.
+    Workers are spawned rather than forked, so they never inherit the parent's
+    geocoding threads or locks.
+    """
+
+    def __init__(self, workers, batch_size=32, pending_per_worker=2):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_pending = workers * pending_per_worker
+        self._pool = multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker)
+
+    def imap(self, items):
+        """Yield (tag, analysis) for each (tag, texts) item, in input order"""
+        pending = collections.deque()
+        for tag, texts in items:
+            pending.append((tag, self._pool.apply_async(_analyze_texts, (texts, self.batch_size))))
+            if len(pending) >= self.max_pending:
+                tag, result = pending.popleft()
+                yield tag, result.get()
+        while pending:
+            tag, result = pending.popleft()
+            yield tag, result.get()
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.close()
+        else:
+            self._pool.terminate()
+
+
+def _prefetch_ahead(batches, geocoder):
+    """Pass batches through, handing each one's locations to the geocoder one batch early"""
+    batch = next(batches, None)
+    if batch is not None:
+        geocoder.prefetch(feedback["location"] for feedback in batch)
+    while batch is not None:
+        upcoming = next(batches, None)
+        if upcoming is not None:
+            geocoder.prefetch(feedback["location"] for feedback in upcoming)
+        yield batch
+        batch = upcoming
+
+
+def _split_cached(batches, cache):
+    """
+    Pair each record batch with the distinct texts that still need analysis:
+    yields ((batch, keys, cached, texts), texts). Without a cache every text is analyzed.
+    """
+    for batch in batches:
+        texts = [feedback["text"] for feedback in batch]
+        if cache is None:
+            yield (batch, None, None, texts), texts
+            continue
+        keys = [cache.key(text) for text in texts]
+        cached = cache.get_many(set(keys))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        texts = list(missing.values())
+        yield (batch, keys, cached, texts), texts
+
+
+def _merge_cached(batch, keys, cached, texts, analysis, cache):
+    """Columnar results for the whole batch from cached rows plus fresh analysis, storing the latter"""
+    if cache is None:
+        return analysis
+    fresh = list(zip(
+        (cache.key(text) for text in texts),
+        analysis["sentiment"], analysis["emotion"], analysis["category"]
+    ))
+    cache.put_many(fresh)
+    cached.update((key, tuple(rest)) for key, *rest in fresh)
+    rows = [cached[key] for key in keys]
+    return {
+        "sentiment": [row[0] for row in rows],
+        "emotion": [row[1] for row in rows],
+        "category": [row[2] for row in rows]
+    }
+
+
+def analyze_records(records, geocoder, batch_size=32, pool=None, cache=None):
+    """
+    Generator stage: enrich feedback records with sentiment, emotion, category and coordinates.
+
+    Locations of the current and next batch are handed to geocoder.prefetch before
+    inference, so a concurrent geocoder resolves them while the models run. With an
+    AnalysisPool, inference runs in worker processes while this process geocodes and
+    yields results in input order. With an AnalysisCache, only texts without a cached
+    result for the current analysis version are sent to the models.
+    """
+    items = _split_cached(_prefetch_ahead(batched(records, batch_size), geocoder), cache)
+    if pool is not None:
+        analyzed = pool.imap(items)
+    else:
+        analyzed = ((tag, _analyze_texts(texts, batch_size)) for tag, texts in items)
+    for (batch, keys, cached, texts), analysis in analyzed:
+        analysis = _merge_cached(batch, keys, cached, texts, analysis, cache)
+        coordinates = geocoder.geocode_many(feedback["location"] for feedback in batch)
+        for i, feedback in enumerate(batch):
+            latitude, longitude = coordinates[feedback["location"]]
+            yield {
+                "text": feedback["text"],
+                "user": feedback["user"],
+                "location": feedback["location"],
+                "latitude": latitude,
+                "longitude": longitude,
+                "timestamp": feedback["timestamp"],
+                "sentiment": analysis["sentiment"][i],
+                "emotion": analysis["emotion"][i],
+                "category": analysis["category"][i]
+            }
+
+
+def _read_checkpoint(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _write_checkpoint(checkpoint_path, checkpoint):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(checkpoint, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+def run_streaming(input_path, output_path, process, checkpoint_path=None, resume=False, flush_every=256):
+    """
+    Stream input records through process(records) and append each result as a JSONL line.
+
+    Every flush_every results the output is fsynced and a checkpoint recording the number
+    of processed records and the output byte offset is written. With resume=True, output
+    past the last checkpoint is truncated and already processed input records are skipped.
+    Resuming is refused if the input file's size or mtime changed since the checkpoint.
+    Returns the total number of processed records.
+    """
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+    stat = os.stat(input_path)
+    source = {
+        "input": os.path.abspath(input_path),
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns
+    }
+    checkpoint = _read_checkpoint(checkpoint_path) if resume else None
+    if checkpoint and not os.path.exists(output_path):
+        checkpoint = None
+    if checkpoint and checkpoint.get("input") != source["input"]:
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('input')}, not {input_path}")
+    if checkpoint and any(checkpoint.get(key) != source[key] for key in ("input_size", "input_mtime_ns")):
+        raise ValueError(f"{input_path} changed since checkpoint {checkpoint_path} was written; run without --resume")
+
+    processed = checkpoint["processed"] if checkpoint else 0
+    offset = checkpoint["offset"] if checkpoint else 0
+
+    records = itertools.islice(iter_feedback(input_path), processed, None)
+    mode = 'r+b' if checkpoint else 'wb'
+    with open(output_path, mode) as output:
+        output.seek(offset)
+        output.truncate()
+        for batch in batched(process(records), flush_every):
+            for result in batch:
+                output.write(json.dumps(result, ensure_ascii=False).encode('utf-8') + b"\n")
+            output.flush()
+            os.fsync(output.fileno())
+            processed += len(batch)
+            _write_checkpoint(checkpoint_path, {
+                **source,
+                "processed": processed,
+                "offset": output.tell()
+            })
+    return processed
@@ -0,0 +1,156 @@
+import bisect
+from collections import defaultdict
+
+import numpy as np
+
+from modules.keywords import KeywordIndex, tokenize
+
+# Relative weight of a query token matching a whole term, the start of a term, or its inside
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.8
+INFIX_WEIGHT = 0.5
+
+# Added to reports containing the whole query verbatim
+PHRASE_BONUS = 1.0
+
+
+def _trigrams(term):
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+class SearchIndex:
+    """
+    Full-text search over report texts, built on the term postings of a KeywordIndex.
+
+    Each query word matches every indexed term that contains it: terms that start
+    with it are found by binary search over the sorted vocabulary, other substring
+    matches through a trigram index over the vocabulary. A report must match every
+    query word; results are ranked by tf-idf of the matched terms, with a bonus when
+    the whole query appears verbatim.
+    """
+
+    def __init__(self, texts, keyword_index=None):
+        self.texts = list(texts)
+        self.keywords = keyword_index or KeywordIndex(self.texts)
+        self.postings = self.keywords._transposed
+        terms = self.keywords.terms
+        self._sorted = sorted(range(len(terms)), key=lambda i: terms[i])
+        self._sorted_terms = [terms[i] for i in self._sorted]
+        trigrams = defaultdict(list)
+        for term_id, term in enumerate(terms):
+            for trigram in _trigrams(term):
+                trigrams[trigram].append(term_id)
+        self._trigrams = {trigram: np.array(ids, dtype=np.int64) for trigram, ids in trigrams.items()}
+        self.document_frequency = np.diff(self.postings.indptr)
+        self.idf = np.log((1 + len(self.texts)) / (1 + self.document_frequency)) + 1.0
+
+    def matching_terms(self, word):
+        """{term id: weight} of indexed terms containing word"""
+        terms = self.keywords.terms
+        matches = {}
+        start = bisect.bisect_left(self._sorted_terms, word)
+        for position in range(start, len(self._sorted_terms)):
+            if not self._sorted_terms[position].startswith(word):
+                break
+            term_id = self._sorted[position]
+            matches[term_id] = EXACT_WEIGHT if terms[term_id] == word else PREFIX_WEIGHT
+        if len(word) >= 3:
+            candidates = None
+            for trigram in _trigrams(word):
+                ids = self._trigrams.get(trigram)
+                if ids is None:
+                    return matches
+                candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            for term_id in candidates.tolist():
+                if term_id not in matches and word in terms[term_id]:
+                    matches[term_id] = INFIX_WEIGHT
+        return matches
+
+    def _weights(self, terms):
+        """Term ids and tf-idf weights of {term id: weight}"""
+        ids = np.fromiter(terms, dtype=np.int64, count=len(terms))
+        return ids, np.fromiter(terms.values(), dtype=float, count=len(terms)) * self.idf[ids]
+
+    def _postings(self, ids, weights):
+        """Sorted positions of reports containing any of the terms, with their scores"""
+        starts = self.postings.indptr[ids]
+        lengths = self.postings.indptr[ids + 1] - starts
+        # Offsets of every matched term's postings in the CSR arrays
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        positions, inverse = np.unique(self.postings.indices[offsets], return_inverse=True)
+        scores = np.bincount(inverse, weights=self.postings.data[offsets] * np.repeat(weights, lengths),
+                             minlength=len(positions))
+        return positions, scores
+
+    def search(self, query, rows=None):
+        """
+        Positions of reports matching query, best first, with their scores.
+        rows optionally restricts results to a sorted subset of positions (e.g. the filtered reports).
+
+        Candidates come from the postings of the word matching the fewest reports; the
+        other words are only scored on those candidates, so the cost follows the number
+        of matching reports rather than the size of the dataset.
+        """
+        words = tokenize(query)
+        if not words:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        matches = [self.matching_terms(word) for word in words]
+        if not all(matches):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        weighted = [self._weights(terms) for terms in matches]
+        weighted.sort(key=lambda pair: self.document_frequency[pair[0]].sum())
+        positions, scores = self._postings(*weighted[0])
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            at = np.searchsorted(rows, positions)
+            allowed = at < len(rows)
+            allowed[allowed] = rows[at[allowed]] == positions[allowed]
+            positions, scores = positions[allowed], scores[allowed]
+        for ids, weights in weighted[1:]:
+            # Reports must match every word
+            term_weights = np.zeros(len(self.keywords.terms))
+            term_weights[ids] = weights
+            word_scores = self.keywords.matrix[positions] @ term_weights
+            hit = word_scores > 0
+            positions, scores = positions[hit], scores[hit] + word_scores[hit]
+        phrase = query.strip().lower()
+        if len(words) > 1 and phrase:
+            scores = scores + PHRASE_BONUS * np.fromiter(
+                (phrase in self.texts[i].lower() for i in positions.tolist()), dtype=float, count=len(positions)
+            )
+        order = np.lexsort((positions, -scores))
+        return positions[order], scores[order]
+
+
+def paginate(positions, page, page_size):
+    """Slice of positions for a 1-based page number, and the number of pages"""
+    pages = max(1, -(-len(positions) // page_size))
+    page = min(max(page, 1), pages)
+    return positions[(page - 1) * page_size:page * page_size], pages
+
+
+if __name__ == "__main__":
+    # Query latency against a case-insensitive scan: python -m modules.search [rows]
+    import sys
+    import time
+
+    import pandas as pd
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(0)
+    words = np.array([f"word{i}" for i in range(20000)] + ['pothole', 'potholes', 'garbage', 'water', 'hospital'])
+    texts = [" ".join(rng.choice(words, 12)) for _ in range(n)]
+
+    start = time.perf_counter()
+    index = SearchIndex(texts)
+    print(f"{n} texts indexed in {time.perf_counter() - start:.2f} s")
+
+    series = pd.Series(texts)
+    for query in ["pothole", "thole", "word123", "garbage water"]:
+        start = time.perf_counter()
+        positions, _ = index.search(query)
+        indexed = time.perf_counter() - start
+        start = time.perf_counter()
+        series.str.contains(query, case=False, regex=False).sum()
+        scanned = time.perf_counter() - start
+        print(f"{query!r:>16}: {len(positions):6d} hits, index {indexed * 1000:6.1f} ms, scan {scanned * 1000:6.0f} ms")
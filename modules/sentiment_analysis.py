@@ -1,28 +1,116 @@
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from transformers import pipeline
+import functools
+import hashlib
+import os
+import threading
+from modules.categorizer import get_default_categorizer
+from modules.hub import model_revision
 
-# Initialize sentiment analyzer (VADER)
-analyzer = SentimentIntensityAnalyzer()
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
 
-# Emotion detection model from HuggingFace
-emotion_analyzer = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base")
+# "pytorch" runs the transformers pipeline; "onnx" an int8-quantized ONNX Runtime export
+EMOTION_BACKENDS = ("pytorch", "onnx")
+
+# VADER compound scores at or beyond +/- this value are Positive / Negative
+SENTIMENT_THRESHOLD = 0.05
+
+# Models are built on first use so importing this module stays cheap
+_analyzer = None
+_emotion_analyzer = None
+_model_lock = threading.Lock()
+
+def get_sentiment_analyzer():
+    """Return the shared VADER analyzer, creating it on first call"""
+    global _analyzer
+    if _analyzer is None:
+        with _model_lock:
+            if _analyzer is None:
+                from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+def emotion_backend():
+    """Configured emotion backend, from the EMOTION_BACKEND environment variable (default pytorch)"""
+    backend = os.environ.get("EMOTION_BACKEND", "pytorch")
+    if backend not in EMOTION_BACKENDS:
+        raise ValueError(f"Unknown EMOTION_BACKEND {backend!r}, expected one of {EMOTION_BACKENDS}")
+    return backend
+
+def get_emotion_analyzer():
+    """Return the shared emotion classifier for the configured backend, loading it on first call"""
+    global _emotion_analyzer
+    if _emotion_analyzer is None:
+        with _model_lock:
+            if _emotion_analyzer is None:
+                if emotion_backend() == "onnx":
+                    from modules.emotion_onnx import OnnxEmotionClassifier
+                    _emotion_analyzer = OnnxEmotionClassifier(EMOTION_MODEL, revision=model_revision(EMOTION_MODEL))
+                else:
+                    from transformers import pipeline
+                    # Pin the weights analysis_version was computed from
+                    _emotion_analyzer = pipeline("text-classification", model=EMOTION_MODEL,
+                                                 revision=model_revision(EMOTION_MODEL))
+    return _emotion_analyzer
+
+def emotion_model_revision():
+    """
+    Identifies the emotion model weights in use: for the pytorch backend the Hub commit
+    EMOTION_MODEL resolves to (only its config is fetched, or read from the local cache
+    when offline), for onnx a sha1 of the int8 weights exported from that commit.
+    Computed once per process and backend.
+    """
+    return _emotion_model_revision(emotion_backend())
+
+@functools.lru_cache(maxsize=None)
+def _emotion_model_revision(backend):
+    revision = model_revision(EMOTION_MODEL)
+    if backend == "onnx":
+        from modules.emotion_onnx import ensure_exported
+        digest = hashlib.sha1()
+        with open(ensure_exported(EMOTION_MODEL, revision=revision), 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+        return f"sha1:{digest.hexdigest()}"
+    return revision
+
+def analysis_version():
+    """
+    Identifies everything that determines analyze_batch output: the emotion model, its
+    revision and backend, the installed model libraries, the sentiment thresholds and
+    the keyword taxonomy. Cached results are only valid for the same version.
+    """
+    from importlib import metadata
+    backend = emotion_backend()
+    parts = [
+        EMOTION_MODEL,
+        f"revision={emotion_model_revision()}",
+        f"backend={backend}",
+        f"sentiment-thresholds={SENTIMENT_THRESHOLD}",
+        f"taxonomy={get_default_categorizer().version}"
+    ]
+    packages = ["transformers", "vaderSentiment"]
+    if backend == "onnx":
+        from modules.emotion_onnx import ONNX_MAX_LENGTH
+        parts.append(f"max-length={ONNX_MAX_LENGTH}")
+        packages.append("onnxruntime")
+    for package in packages:
+        try:
+            parts.append(f"{package}={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            parts.append(f"{package}=missing")
+    return "|".join(parts)
 
 # Categorization function
 def categorize_feedback(feedback):
-    categories = {
-        "Infrastructure": ["potholes", "roads", "street lights", "construction", "sewerage"],
-        "Health": ["water supply", "health", "hospital", "medicines", "doctors", "sanitation"],
-        "Environment": ["garbage", "pollution", "waste", "cleanliness", "recycling"],
-        "Education": ["school", "education", "learning", "teachers", "students", "classroom"],
-        "Public Safety": ["traffic", "safety", "accident", "crime", "emergency", "security", "killing","kidnapping"]
-    }
-    
-    feedback_lower = feedback.lower()
-    
-    for category, keywords in categories.items():
-        if any(keyword in feedback_lower for keyword in keywords):
-            return category
-    return "Uncategorized"  # If no match, return Uncategorized
+    """Return the best matching category from the keyword taxonomy (or Uncategorized)"""
+    return get_default_categorizer().categorize(feedback)
+
+def sentiment_label(compound):
+    """Map a VADER compound score to Positive / Negative / Neutral"""
+    if compound >= SENTIMENT_THRESHOLD:
+        return "Positive"
+    if compound <= -SENTIMENT_THRESHOLD:
+        return "Negative"
+    return "Neutral"
 
 def analyze_sentiment_and_categorize(feedback):
     """
@@ -30,15 +118,11 @@ def analyze_sentiment_and_categorize(feedback):
     and categorizes the feedback.
     """
     # VADER Sentiment Analysis
-    sentiment_score = analyzer.polarity_scores(feedback)
-    sentiment = "Neutral"
-    if sentiment_score["compound"] >= 0.05:
-        sentiment = "Positive"
-    elif sentiment_score["compound"] <= -0.05:
-        sentiment = "Negative"
+    sentiment_score = get_sentiment_analyzer().polarity_scores(feedback)
+    sentiment = sentiment_label(sentiment_score["compound"])
     
     # Emotion Detection
-    emotion_result = emotion_analyzer(feedback)
+    emotion_result = get_emotion_analyzer()(feedback)
     emotion = emotion_result[0]['label']
     
     # Categorize Feedback
@@ -46,7 +130,68 @@ def analyze_sentiment_and_categorize(feedback):
     
     return sentiment, emotion, category
 
-# Test with an example feedback
-feedback_example = "There are huge potholes in Sector 16, it's really dangerous!"
-sentiment, emotion, category = analyze_sentiment_and_categorize(feedback_example)
-print(f"Sentiment: {sentiment}, Emotion: {emotion}, Category: {category}")
+def analyze_batch(feedbacks, batch_size=32, max_length=512):
+    """
+    Batched version of analyze_sentiment_and_categorize.
+
+    Accepts any iterable of texts and returns columnar results:
+    {"sentiment": [...], "emotion": [...], "category": [...]} in input order.
+    Texts are sorted by length before batching so each forward pass pads
+    to a similar sequence length.
+    """
+    texts = list(feedbacks)
+    analyzer = get_sentiment_analyzer()
+    emotion_analyzer = get_emotion_analyzer()
+    
+    # VADER and keyword categorization are cheap per-text operations
+    sentiments = [sentiment_label(analyzer.polarity_scores(text)["compound"]) for text in texts]
+    categories = [categorize_feedback(text) for text in texts]
+    
+    # Emotion Detection in length-bucketed batches
+    emotions = [None] * len(texts)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        outputs = emotion_analyzer(
+            [texts[i] for i in bucket],
+            batch_size=batch_size,
+            truncation=True,
+            max_length=max_length
+        )
+        for i, output in zip(bucket, outputs):
+            emotions[i] = output['label']
+    
+    return {
+        "sentiment": sentiments,
+        "emotion": emotions,
+        "category": categories
+    }
+
+# Maximum acceptable cost of `import modules.sentiment_analysis`, in seconds
+IMPORT_TIME_BUDGET = 0.5
+
+def measure_import_time():
+    """Time a cold import of this module in a fresh interpreter"""
+    import subprocess
+    import sys
+    code = (
+        "import time; start = time.perf_counter(); "
+        "import modules.sentiment_analysis; "
+        "print(time.perf_counter() - start)"
+    )
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=project_root, text=True)
+    return float(output.strip())
+
+if __name__ == "__main__":
+    import sys
+    
+    if "--check-import-time" in sys.argv:
+        elapsed = measure_import_time()
+        print(f"Import time: {elapsed * 1000:.1f} ms (budget {IMPORT_TIME_BUDGET * 1000:.0f} ms)")
+        sys.exit(0 if elapsed <= IMPORT_TIME_BUDGET else 1)
+    
+    # Test with an example feedback
+    feedback_example = "There are huge potholes in Sector 16, it's really dangerous!"
+    sentiment, emotion, category = analyze_sentiment_and_categorize(feedback_example)
+    print(f"Sentiment: {sentiment}, Emotion: {emotion}, Category: {category}")
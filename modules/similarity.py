@@ -0,0 +1,221 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+# Rows per block when comparing all members of a large bucket
+PAIR_BLOCK = 1024
+
+# Rows of an oversized bucket are compared with this many sampled rows of it
+MAX_BUCKET = 256
+
+# Buckets up to this size link every above-threshold pair directly
+SMALL_BUCKET = 64
+
+# Links collected before they are merged into the union-find forest
+UNION_BATCH = 1 << 20
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class SimilarityIndex:
+    """
+    In-process approximate cosine-similarity index over embedding rows.
+
+    Each of n_tables hash tables buckets the vectors by the signs of n_bits random
+    projections (random-hyperplane LSH), so vectors at a small angle usually share
+    a bucket in at least one table. Queries compare exactly against the union of
+    their buckets only, which keeps them sub-linear in the number of rows.
+    """
+
+    def __init__(self, vectors, n_tables=16, n_bits=None, seed=0):
+        self.vectors = _normalize(vectors)
+        n, dim = self.vectors.shape
+        # About sixteen rows per bucket on average
+        self.n_bits = n_bits or int(np.clip(np.log2(max(n, 1) / 16), 1, 16))
+        rng = np.random.default_rng(seed)
+        self._planes = rng.normal(size=(n_tables, dim, self.n_bits)).astype(np.float32)
+        self._weights = (1 << np.arange(self.n_bits)).astype(np.int64)
+        self._tables = []
+        for planes in self._planes:
+            codes = (self.vectors @ planes > 0).astype(np.int64) @ self._weights
+            order = np.argsort(codes, kind='stable')
+            self._tables.append((codes[order], order))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def candidates(self, vector, multiprobe=True):
+        """Rows sharing a bucket with vector in any table (and, with multiprobe, a bucket one bit away)"""
+        vector = _normalize(np.atleast_2d(vector))[0]
+        found = []
+        for planes, (codes, order) in zip(self._planes, self._tables):
+            code = int((vector @ planes > 0).astype(np.int64) @ self._weights)
+            probes = [code]
+            if multiprobe:
+                probes += [code ^ int(bit) for bit in self._weights]
+            for probe in probes:
+                lo, hi = np.searchsorted(codes, [probe, probe + 1])
+                found.append(order[lo:hi])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def query(self, vector, k=10, threshold=None, exclude=None):
+        """Up to k (rows, cosine similarities) most similar to vector, best first"""
+        rows = self.candidates(vector)
+        if exclude is not None:
+            rows = rows[rows != exclude]
+        scores = self.vectors[rows] @ _normalize(np.atleast_2d(vector))[0]
+        if threshold is not None:
+            keep = scores >= threshold
+            rows, scores = rows[keep], scores[keep]
+        best = np.argsort(-scores, kind='stable')[:k]
+        return rows[best], scores[best]
+
+    def similar_to_row(self, row, k=10, threshold=None):
+        return self.query(self.vectors[row], k=k, threshold=threshold, exclude=row)
+
+    def components(self, threshold, within=None, max_bucket=MAX_BUCKET):
+        """
+        Smallest row of each row's component in the graph linking rows that share a
+        bucket and have cosine >= threshold; rows only link to rows with the same
+        within label, and rows labelled -1 stay on their own.
+
+        Links are merged into a union-find forest as they are found, at most one per
+        row and component it reaches in a large bucket, so memory stays bounded by a
+        block of scores and a batch of links instead of growing with the pairs.
+        Buckets whose rows are already connected are skipped, and rows of a bucket
+        larger than max_bucket are only compared with max_bucket rows sampled from
+        it, keeping each table's cost linear in rows.
+        """
+        n = len(self)
+        parent = np.arange(n)
+        labels = np.zeros(n, dtype=np.int64) if within is None else np.asarray(within, dtype=np.int64)
+        rng = np.random.default_rng(0)
+        for codes, order in self._tables:
+            # Rows are ascending inside each bucket (stable sort by code)
+            keep = labels[order] != -1
+            codes, order = codes[keep], order[keep]
+            bounds = np.flatnonzero(np.diff(codes)) + 1
+            pending = []
+            pending_size = 0
+            for bucket in np.split(order, bounds):
+                if len(bucket) < 2:
+                    continue
+                if len(bucket) <= SMALL_BUCKET:
+                    linked = self.vectors[bucket] @ self.vectors[bucket].T >= threshold
+                    if within is not None:
+                        linked &= labels[bucket][:, None] == labels[bucket]
+                    i, j = np.nonzero(np.triu(linked, 1))
+                    pending.append((bucket[i], bucket[j]))
+                    pending_size += len(i)
+                    continue
+                roots = _roots(parent, bucket)
+                if np.all(roots == roots[0]):
+                    continue
+                pivots = bucket
+                if len(bucket) > max_bucket:
+                    pivots = bucket[np.sort(rng.choice(len(bucket), max_bucket, replace=False))]
+                for start in range(0, len(bucket), PAIR_BLOCK):
+                    block = bucket[start:start + PAIR_BLOCK]
+                    # Pivots grouped by component: a row needs one link per component it reaches
+                    pivot_roots = _roots(parent, pivots)
+                    by_root = np.argsort(pivot_roots, kind='stable')
+                    starts = np.flatnonzero(np.r_[True, np.diff(pivot_roots[by_root]) != 0])
+                    linked = self.vectors[block] @ self.vectors[pivots[by_root]].T >= threshold
+                    if within is not None:
+                        linked &= labels[block][:, None] == labels[pivots[by_root]]
+                    i, j = np.nonzero(np.logical_or.reduceat(linked, starts, axis=1))
+                    targets = pivot_roots[by_root][starts[j]]
+                    new = _roots(parent, block)[i] != targets
+                    pending.append((block[i][new], targets[new]))
+                    pending_size += new.sum()
+                    # Merging before the next block of a large bucket collapses its pivots' components
+                    if pending_size >= UNION_BATCH or (pending_size and start + PAIR_BLOCK < len(bucket)):
+                        _union(parent, *map(np.concatenate, zip(*pending)))
+                        pending, pending_size = [], 0
+            if pending:
+                _union(parent, *map(np.concatenate, zip(*pending)))
+        return _roots(parent, np.arange(n))
+
+
+def _roots(parent, rows):
+    """Union-find roots of rows, compressing their paths"""
+    roots = parent[rows]
+    while True:
+        up = parent[roots]
+        if np.array_equal(up, roots):
+            parent[rows] = roots
+            return roots
+        roots = up
+
+
+def _union(parent, a, b):
+    """Merge the trees of each (a, b) pair; every merged tree is rooted at its smallest row"""
+    a, b = _roots(parent, a), _roots(parent, b)
+    linked = a != b
+    if not linked.any():
+        return
+    a, b = a[linked], b[linked]
+    n = len(parent)
+    graph = coo_matrix((np.ones(len(a), dtype=np.int8), (a, b)), shape=(n, n))
+    _, component = connected_components(graph, directed=False)
+    smallest = np.full(component.max() + 1, n)
+    np.minimum.at(smallest, component, np.arange(n))
+    nodes = np.concatenate([a, b])
+    parent[nodes] = smallest[component[nodes]]
+
+
+def near_duplicate_groups(index, threshold=0.85, within=None):
+    """
+    Group rows linked by chains of cosine similarity >= threshold.
+
+    within, an optional label per row, only links rows with the same label (rows
+    labelled -1 stay on their own). Returns a group id per row, numbered by first
+    appearance.
+    """
+    roots = index.components(threshold, within=within)
+    _, first, groups = np.unique(roots, return_index=True, return_inverse=True)
+    return np.argsort(np.argsort(first))[groups]
+
+
+if __name__ == "__main__":
+    # Recall and latency against exact search: python -m modules.similarity
+    import time
+
+    rng = np.random.default_rng(0)
+    n, dim = 100_000, 384
+    topics = rng.normal(size=(2_000, dim)).astype(np.float32)
+    vectors = topics[rng.integers(0, len(topics), n)] + rng.normal(0, 0.4, (n, dim)).astype(np.float32)
+
+    start = time.perf_counter()
+    index = SimilarityIndex(vectors)
+    print(f"index over {n} x {dim}: built in {time.perf_counter() - start:.2f} s, {index.n_bits} bits x {len(index._tables)} tables")
+
+    queries = rng.integers(0, n, 200)
+    start = time.perf_counter()
+    approximate = [index.similar_to_row(row, k=10)[0] for row in queries]
+    ann = (time.perf_counter() - start) / len(queries)
+    start = time.perf_counter()
+    recall = 0.0
+    for row, found in zip(queries, approximate):
+        scores = index.vectors @ index.vectors[row]
+        scores[row] = -np.inf
+        exact = np.argpartition(-scores, 10)[:10]
+        recall += len(np.intersect1d(exact, found)) / 10
+    exact_time = (time.perf_counter() - start) / len(queries)
+    print(f"top-10 query: {ann * 1000:.2f} ms vs exact {exact_time * 1000:.2f} ms, recall {recall / len(queries):.3f}")
+
+    start = time.perf_counter()
+    groups = near_duplicate_groups(index, threshold=0.85)
+    print(f"near-duplicate groups at 0.85: {groups.max() + 1} in {time.perf_counter() - start:.2f} s")
+
+    # A few huge groups: every bucket is oversized, so pivots keep the cost linear
+    few = rng.normal(size=(5, dim)).astype(np.float32)
+    clumped = few[rng.integers(0, len(few), 20_000)] + rng.normal(0, 0.2, (20_000, dim)).astype(np.float32)
+    start = time.perf_counter()
+    groups = near_duplicate_groups(SimilarityIndex(clumped), threshold=0.85)
+    print(f"20000 reports in 5 topics: {groups.max() + 1} groups in {time.perf_counter() - start:.2f} s")
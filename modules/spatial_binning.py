@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+# Zoom levels that get their own pre-binned layer; other zooms use the nearest one
+DEFAULT_ZOOMS = tuple(range(3, 15))
+
+# Finer levels are dropped once they would ship more bins than this to the browser
+DEFAULT_MAX_BINS = 50_000
+
+# Cells per 256 px map tile along each axis, i.e. one cell every ~32 px on screen
+DEFAULT_CELLS_PER_TILE = 8
+
+DEFAULT_FACETS = ('sentiment', 'emotion', 'category')
+
+MAX_LATITUDE = 85.05112878
+
+
+def _mercator(lat, lon):
+    """Project degrees to Web Mercator coordinates in [0, 1) x [0, 1)"""
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0
+    return np.clip(x, 0.0, np.nextafter(1.0, 0)), np.clip(y, 0.0, np.nextafter(1.0, 0))
+
+
+def cell_ids(lat, lon, zoom, cells_per_tile=DEFAULT_CELLS_PER_TILE):
+    """Integer id of the grid cell containing each point at a zoom level"""
+    side = (2 ** zoom) * cells_per_tile
+    x, y = _mercator(lat, lon)
+    return (x * side).astype(np.int64) * side + (y * side).astype(np.int64)
+
+
+def bin_points(lat, lon, zoom, weights=None, groups=None, cells_per_tile=DEFAULT_CELLS_PER_TILE):
+    """
+    Aggregate points into grid cells at one zoom level.
+
+    groups is an optional (rows x k) integer array of facet codes; points are then
+    binned per cell and facet combination. Returns a DataFrame with the weighted
+    centroid ('latitude', 'longitude'), summed 'weight', point 'count' and, when
+    grouped, one column per facet code ('group_0', ...).
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    weights = np.ones(len(lat)) if weights is None else np.asarray(weights, dtype=float)
+
+    # Fold facet codes into the cell id (mixed radix) so one 1-D unique does the grouping
+    keys = cell_ids(lat, lon, zoom, cells_per_tile)
+    radices = []
+    if groups is not None:
+        groups = np.asarray(groups, dtype=np.int64).reshape(len(lat), -1)
+        radices = [int(column.max()) + 1 if len(column) else 1 for column in groups.T]
+        for column, radix in zip(groups.T, radices):
+            keys = keys * radix + column
+    unique, inverse = np.unique(keys, return_inverse=True)
+
+    weight = np.bincount(inverse, weights=weights, minlength=len(unique))
+    count = np.bincount(inverse, minlength=len(unique))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centroid_lat = np.bincount(inverse, weights=lat * weights, minlength=len(unique)) / weight
+        centroid_lon = np.bincount(inverse, weights=lon * weights, minlength=len(unique)) / weight
+
+    codes = []
+    for radix in reversed(radices):
+        codes.append(unique % radix)
+        unique = unique // radix
+
+    bins = pd.DataFrame({
+        'cell': unique,
+        'latitude': centroid_lat,
+        'longitude': centroid_lon,
+        'weight': weight,
+        'count': count
+    })
+    for i, column in enumerate(reversed(codes)):
+        bins[f'group_{i}'] = column
+    return bins
+
+
+def build_bin_pyramid(df, zooms=DEFAULT_ZOOMS, facets=DEFAULT_FACETS, weight_column=None,
+                      cells_per_tile=DEFAULT_CELLS_PER_TILE, max_bins=DEFAULT_MAX_BINS):
+    """
+    Pre-bin a feedback DataFrame at every zoom level, split by facet values.
+
+    Levels are built from coarse to fine and stop at the first one with more than
+    max_bins rows, so the pyramid size is bounded regardless of the number of points;
+    deeper zooms fall back to the finest level kept.
+
+    Returns {'zooms': [...], 'facets': [...], 'labels': {facet: [values]},
+    'bins': {zoom: DataFrame}} where each bins frame has one row per
+    (cell, facet combination) with a code column per facet.
+    """
+    df = df.dropna(subset=['latitude', 'longitude'])
+    labels = {}
+    codes = []
+    for facet in facets:
+        categorical = pd.Categorical(df[facet].astype(str))
+        labels[facet] = [str(value) for value in categorical.categories]
+        codes.append(categorical.codes.astype(np.int64))
+    groups = np.column_stack(codes) if codes else None
+    weights = df[weight_column].to_numpy() if weight_column else None
+
+    bins = {}
+    for zoom in sorted(zooms):
+        level = bin_points(
+            df['latitude'].to_numpy(), df['longitude'].to_numpy(), zoom,
+            weights=weights, groups=groups, cells_per_tile=cells_per_tile
+        )
+        if bins and max_bins is not None and len(level) > max_bins:
+            break
+        bins[zoom] = level.rename(columns={f'group_{i}': facet for i, facet in enumerate(facets)})
+    return {'zooms': list(bins), 'facets': list(facets), 'labels': labels, 'bins': bins}
+
+
+def nearest_zoom(pyramid, zoom):
+    return min(pyramid['zooms'], key=lambda level: abs(level - zoom))
+
+
+def query_bins(pyramid, zoom, **filters):
+    """
+    Bins for one zoom level restricted to facet values, merged back to one row per cell.
+    query_bins(pyramid, 10, sentiment=['Negative'], category=['Health'])
+    """
+    level = pyramid['bins'][nearest_zoom(pyramid, zoom)]
+    mask = np.ones(len(level), dtype=bool)
+    for facet, values in filters.items():
+        if values is None:
+            continue
+        labels = pyramid['labels'][facet]
+        allowed = [labels.index(value) for value in values if value in labels]
+        mask &= np.isin(level[facet].to_numpy(), allowed)
+    level = level[mask]
+
+    weighted = level.assign(
+        lat_w=level['latitude'] * level['weight'],
+        lon_w=level['longitude'] * level['weight']
+    ).groupby('cell', sort=False)[['lat_w', 'lon_w', 'weight', 'count']].sum()
+    return pd.DataFrame({
+        'latitude': weighted['lat_w'] / weighted['weight'],
+        'longitude': weighted['lon_w'] / weighted['weight'],
+        'weight': weighted['weight'],
+        'count': weighted['count']
+    }).reset_index(drop=True)
+
+
+def pyramid_payload(pyramid, decimals=5):
+    """
+    Compact JSON-ready form for the browser: per zoom, rows of
+    [lat, lon, weight, facet codes...].
+    """
+    columns = ['latitude', 'longitude', 'weight'] + pyramid['facets']
+    levels = {}
+    for zoom, level in pyramid['bins'].items():
+        values = level[columns].to_numpy(dtype=float)
+        values[:, :2] = np.round(values[:, :2], decimals)
+        rows = values.tolist()
+        for row in rows:
+            for i in range(2, len(row)):
+                row[i] = int(row[i]) if row[i].is_integer() else row[i]
+        levels[str(zoom)] = rows
+    return {
+        'zooms': pyramid['zooms'],
+        'facets': pyramid['facets'],
+        'labels': pyramid['labels'],
+        'bins': levels
+    }
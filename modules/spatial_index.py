@@ -0,0 +1,109 @@
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def _radians(lat, lon):
+    return np.radians(np.column_stack([np.atleast_1d(lat), np.atleast_1d(lon)]).astype(np.float64))
+
+
+class SpatialIndex:
+    """
+    Geographic lookups over report coordinates, built once per dataset.
+
+    A haversine BallTree answers radius and k-nearest queries; latitudes sorted
+    once answer bounding boxes with a binary search plus a longitude check on the
+    matching band. Results are row positions in the frame the index was built
+    from; rows without coordinates are never returned.
+    """
+
+    def __init__(self, latitudes, longitudes, leaf_size=40):
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        located = np.isfinite(latitudes) & np.isfinite(longitudes)
+        self.rows = np.flatnonzero(located)
+        self.latitudes = latitudes[located]
+        self.longitudes = longitudes[located]
+        self.tree = BallTree(_radians(self.latitudes, self.longitudes), metric='haversine', leaf_size=leaf_size)
+        self._lat_order = np.argsort(self.latitudes, kind='stable')
+        self._sorted_lat = self.latitudes[self._lat_order]
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        return cls(df['latitude'].to_numpy(dtype=np.float64, na_value=np.nan),
+                   df['longitude'].to_numpy(dtype=np.float64, na_value=np.nan), **kwargs)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def within(self, lat, lon, radius_km, sort=True):
+        """Positions of reports within radius_km of a point and their distances in km (nearest first if sort)"""
+        indices, distances = self.tree.query_radius(
+            _radians(lat, lon), r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=sort
+        )
+        return self.rows[indices[0]], distances[0] * EARTH_RADIUS_KM
+
+    def nearest(self, lat, lon, k=10):
+        """Positions of the k reports nearest to a point and their distances in km, nearest first"""
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        distances, indices = self.tree.query(_radians(lat, lon), k=k)
+        return self.rows[indices[0]], distances[0] * EARTH_RADIUS_KM
+
+    def in_bbox(self, south, west, north, east):
+        """
+        Sorted positions of reports inside a bounding box in degrees. west > east
+        means the box crosses the antimeridian; a box 360 degrees wide or more
+        keeps every longitude.
+        """
+        start = np.searchsorted(self._sorted_lat, south, side='left')
+        end = np.searchsorted(self._sorted_lat, north, side='right')
+        band = self._lat_order[start:end]
+        if east - west < 360:
+            west = (west + 180) % 360 - 180
+            east = (east + 180) % 360 - 180
+            lon = self.longitudes[band]
+            inside = (lon >= west) & (lon <= east) if west <= east else (lon >= west) | (lon <= east)
+            band = band[inside]
+        return np.sort(self.rows[band])
+
+
+if __name__ == "__main__":
+    # Query timings against full scans: python -m modules.spatial_index [rows]
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    centers = np.column_stack([rng.uniform(8, 34, 500), rng.uniform(68, 92, 500)])
+    points = centers[rng.integers(0, len(centers), n)] + rng.normal(0, 0.03, (n, 2))
+
+    start = time.perf_counter()
+    index = SpatialIndex(points[:, 0], points[:, 1])
+    print(f"index over {n} points built in {time.perf_counter() - start:.2f} s")
+
+    lat, lon = centers[0]
+    for name, query, scan in [
+        ("within 5 km", lambda: index.within(lat, lon, 5)[0],
+         lambda: np.flatnonzero(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(
+             np.sin(np.radians(points[:, 0] - lat) / 2) ** 2
+             + np.cos(np.radians(lat)) * np.cos(np.radians(points[:, 0]))
+             * np.sin(np.radians(points[:, 1] - lon) / 2) ** 2)) <= 5)),
+        ("bbox 1 deg", lambda: index.in_bbox(lat - 0.5, lon - 0.5, lat + 0.5, lon + 0.5),
+         lambda: np.flatnonzero((points[:, 0] >= lat - 0.5) & (points[:, 0] <= lat + 0.5)
+                                & (points[:, 1] >= lon - 0.5) & (points[:, 1] <= lon + 0.5))),
+        ("10 nearest", lambda: index.nearest(lat, lon, 10)[0], None)
+    ]:
+        started = time.perf_counter()
+        found = query()
+        indexed = time.perf_counter() - started
+        line = f"{name:>12}: {len(found):6d} reports, index {indexed * 1000:7.2f} ms"
+        if scan is not None:
+            started = time.perf_counter()
+            expected = scan()
+            line += f", full scan {(time.perf_counter() - started) * 1000:6.1f} ms"
+            assert np.array_equal(np.sort(found), expected)
+        print(line)
+
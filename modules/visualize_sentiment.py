@@ -1,4 +1,6 @@
 import json
+import os
+import sys
 import matplotlib.pyplot as plt
 import seaborn as sns
 from collections import Counter
@@ -8,6 +10,10 @@ import seaborn as sns
 from collections import Counter
 import pandas as pd
 
+# Allow running as a script from the project root (python modules/visualize_sentiment.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
 # Load the feedback results
 with open('data/feedback_results.json', 'r') as file:
@@ -81,20 +87,14 @@ plt.tight_layout()
 plt.show()
 
 
-def show_top_issues(data, top_n=3):
-    from collections import Counter
+def show_top_issues(data, top_n=3, index=None):
+    from modules.keywords import DEFAULT_STOPWORDS, KeywordIndex
 
-    issue_counter = Counter()
-    for item in data:
-        issue_words = item['text'].lower().split()
-        issue_counter.update(issue_words)
+    # Texts are tokenized once into a term-count matrix; pass index to reuse one
+    index = index or KeywordIndex([item['text'] for item in data])
 
-    # Exclude common stopwords
-    stopwords = {'in', 'the', 'is', 'are', 'on', 'for', 'a', 'of', 'to', 'and', 'its', 'it'}
-    filtered_issues = {word: count for word, count in issue_counter.items() if word not in stopwords and len(word) > 3}
-
-    # Get top N issues
-    top_issues = sorted(filtered_issues.items(), key=lambda x: x[1], reverse=True)[:top_n]
+    # Get top N issues, excluding common stopwords and short words
+    top_issues = index.top_terms(k=top_n, min_length=4, stopwords=DEFAULT_STOPWORDS)
 
     print(f"\n🔍 Top {top_n} Most Reported Issues:")
     for issue, count in top_issues: